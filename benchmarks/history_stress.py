@@ -0,0 +1,136 @@
+"""Multi-process stress test for history writes.
+
+Starts N processes that each log M results (in random batch sizes, with a
+large payload so a single write exceeds any stdio or pipe buffer) to one
+shared history, optionally SIGKILLs extra writers mid-run, and starts from a
+history whose last line was torn by a simulated crash. Then it checks that
+every result from the surviving writers was stored exactly once, that no
+complete line is damaged, and that the aggregate summary matches the history.
+
+Usage (from the repository root):
+
+    python benchmarks/history_stress.py
+    python benchmarks/history_stress.py --processes 32 --entries 500 --backend sqlite
+    python benchmarks/history_stress.py --kill 4    # also kill 4 writers mid-write
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tui.logger import Logger  # noqa: E402
+
+MODE = "Stress"
+DURATION = 30
+TORN_LINE = '{"timestamp": "2026-01-01T00:00:00", "mode": "Stre'
+
+
+def writer(path, backend, writer_id, entries, payload, seed, forever=False):
+    rng = random.Random(seed)
+    logger = Logger(log_file=path, legacy_file=None, backend=backend)
+    seq = 0
+    while forever or seq < entries:
+        batch = []
+        for _ in range(rng.randint(1, 8)):
+            if not forever and seq >= entries:
+                break
+            entry = logger.build_entry(MODE, DURATION, rng.uniform(20, 120), rng.uniform(80, 100), 0)
+            entry.update({"writer": writer_id, "seq": seq, "pad": "x" * payload})
+            batch.append(entry)
+            seq += 1
+        logger.log_entries(batch)
+    logger.close()
+
+
+def count_damaged_lines(path):
+    damaged = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                json.loads(line)
+            except ValueError:
+                damaged += 1
+    return damaged
+
+
+def run(backend, args):
+    workdir = tempfile.mkdtemp(prefix="typer_stress_")
+    path = os.path.join(workdir, "history.db" if backend == "sqlite" else "history.jsonl")
+    if backend == "jsonl":
+        # A previous process crashed halfway through writing its last line
+        with open(path, "w") as f:
+            f.write(TORN_LINE)
+
+    procs = [
+        multiprocessing.Process(target=writer, args=(path, backend, w, args.entries, args.payload, w))
+        for w in range(args.processes)
+    ]
+    victims = [
+        multiprocessing.Process(target=writer, args=(path, backend, -1 - k, 0, args.payload, -1 - k, True))
+        for k in range(args.kill)
+    ]
+    start = time.perf_counter()
+    for p in procs + victims:
+        p.start()
+    for p in victims:
+        time.sleep(random.uniform(0.05, 0.3))
+        p.kill()
+    for p in procs + victims:
+        p.join()
+    elapsed = time.perf_counter() - start
+    failed = [p.exitcode for p in procs if p.exitcode != 0]
+
+    logger = Logger(log_file=path, legacy_file=None, backend=backend)
+    seen = {}
+    total = 0
+    for entry in logger.get_history():
+        if entry.get("mode") != MODE:
+            continue
+        total += 1
+        key = (entry.get("writer"), entry.get("seq"))
+        seen[key] = seen.get(key, 0) + 1
+    expected = {(w, s) for w in range(args.processes) for s in range(args.entries)}
+    lost = len(expected - seen.keys())
+    duplicates = sum(n - 1 for n in seen.values())
+    summary = logger.get_summary(MODE, DURATION)
+    summary_ok = summary is not None and summary.count == total
+    logger.close()
+
+    # The torn line from the simulated crash is the only damage allowed
+    damaged = count_damaged_lines(path) - 1 if backend == "jsonl" else 0
+    written = args.processes * args.entries
+    print(f"{backend:<7} {args.processes:>5} {written:>8} {total - written:>7} {lost:>5} {duplicates:>5} "
+          f"{damaged:>7} {'ok' if summary_ok else 'BAD':>7} {elapsed:>8.2f} {total / elapsed:>9.0f}")
+    return not (failed or lost or duplicates or damaged or not summary_ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=16, help="Concurrent writer processes (default: 16)")
+    parser.add_argument("--entries", type=int, default=200, help="Results per writer (default: 200)")
+    parser.add_argument("--payload", type=int, default=16 * 1024,
+                        help="Extra bytes per result, like a keystroke recording (default: 16384)")
+    parser.add_argument("--kill", type=int, default=0, help="Extra writers to SIGKILL mid-run")
+    parser.add_argument("--backend", choices=("jsonl", "sqlite", "both"), default="both")
+    args = parser.parse_args()
+
+    backends = ("jsonl", "sqlite") if args.backend == "both" else (args.backend,)
+    print(f"{'backend':<7} {'procs':>5} {'written':>8} {'extra':>7} {'lost':>5} {'dups':>5} "
+          f"{'damaged':>7} {'summary':>7} {'time_s':>8} {'per_s':>9}")
+    ok = all([run(backend, args) for backend in backends])
+    if not ok:
+        print("FAILED: results were lost, duplicated or damaged", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Load test for running many TypingSessions in one asyncio process.
+
+Creates N sessions (no UI), then drives each with a simulated typist task
+(steady WPM with occasional mistakes that get backspaced) while an observer
+task per session consumes its async `events()` stream, as a server view
+would. Reports memory per session (idle, after a reset, and at the peak of
+the run), keystroke and event throughput, and how late keystrokes were
+delivered relative to their schedule. Exits 1 when a budget is exceeded.
+
+Usage (from the repository root):
+
+    python benchmarks/session_load.py
+    python benchmarks/session_load.py --sessions 1000 --duration 20
+    python benchmarks/session_load.py --wpm 0 --duration 5   # flat out: maximum throughput
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tui.corpus import sample_words  # noqa: E402
+from tui.session import FINISHED, TypingSession  # noqa: E402
+
+# Default budgets: sessions in one process and what each may cost
+MAX_SESSION_KB = 64
+MAX_LAG_P99_MS = 50
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def text_source(mode_file, rng):
+    return lambda: " ".join(sample_words(mode_file, 100, rng))
+
+
+async def typist(session, rng, delay, error_rate, lags):
+    """Type into session until it ends, correcting each mistake with backspace."""
+    loop = asyncio.get_running_loop()
+    # Staggered over one keystroke interval, like independent users
+    due = loop.time() + rng.random() * delay
+    while not session.finished:
+        if delay:
+            await asyncio.sleep(due - loop.time())
+            lags.append(loop.time() - due)
+            due += delay
+        else:
+            await asyncio.sleep(0)
+        if session.finished:
+            break
+        typed, target = session.user_input, session.target_text
+        if typed and typed[-1] != target[len(typed) - 1]:
+            session.backspace()
+        elif rng.random() < error_rate:
+            session.type_char("~" if target[len(typed)] != "~" else "#")
+        else:
+            session.type_char(target[len(typed)])
+
+
+async def observer(session, counts):
+    async for event in session.events():
+        counts[event] += 1
+        if event == FINISHED:
+            break
+
+
+def traced_kb():
+    return tracemalloc.get_traced_memory()[0] / 1024
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    source = text_source(args.mode, rng)
+    # Load the word list before measuring, so only session state is counted
+    source()
+
+    tracemalloc.start()
+    base = traced_kb()
+    sessions = [TypingSession(source, args.duration, endless=True) for _ in range(args.sessions)]
+    idle_kb = (traced_kb() - base) / args.sessions
+    for session in sessions:
+        session.reset()
+    reset_kb = (traced_kb() - base) / args.sessions
+
+    counts = Counter()
+    observers = [asyncio.create_task(observer(s, counts)) for s in sessions]
+    # Let every observer subscribe before the first key
+    await asyncio.sleep(0)
+
+    # Compact, since it is traced along with the sessions
+    lags = array("d")
+    delay = 60 / (args.wpm * 5) if args.wpm else 0
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    typists = [
+        asyncio.create_task(typist(s, random.Random(rng.random()), delay, args.error_rate, lags))
+        for s in sessions
+    ]
+    peak_kb = 0.0
+    while not all(t.done() for t in typists):
+        await asyncio.sleep(0.25)
+        peak_kb = max(peak_kb, traced_kb() - base)
+    await asyncio.gather(*typists, *observers)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    peak_kb = max(peak_kb, tracemalloc.get_traced_memory()[1] / 1024 - base)
+    tracemalloc.stop()
+
+    keys = sum(len(s.recording) for s in sessions)
+    events = sum(counts.values())
+    lags = sorted(lags)
+    return {
+        "sessions": args.sessions,
+        "finished": counts[FINISHED],
+        "idle_kb": idle_kb,
+        "reset_kb": reset_kb,
+        "peak_kb": peak_kb / args.sessions,
+        "keys": keys,
+        "events": events,
+        "elapsed": elapsed,
+        "cpu": cpu,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "mean_wpm": sum(s.result[0] for s in sessions if s.result) / max(1, counts[FINISHED]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500, help="Concurrent sessions (default: 500)")
+    parser.add_argument("--duration", type=int, default=10, help="Test length in seconds (default: 10)")
+    parser.add_argument("--wpm", type=float, default=150, help="Typing speed per session; 0 = flat out (default: 150)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Chance of a mistyped key (default: 0.05)")
+    parser.add_argument("--mode", default="medium.txt", help="Asset to draw text from (default: medium.txt)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-session-kb", type=float, default=MAX_SESSION_KB,
+                        help=f"Fail if peak memory per session exceeds this (default: {MAX_SESSION_KB})")
+    parser.add_argument("--max-lag-ms", type=float, default=MAX_LAG_P99_MS,
+                        help=f"Fail if p99 keystroke lag exceeds this, when --wpm is set (default: {MAX_LAG_P99_MS})")
+    args = parser.parse_args()
+
+    r = asyncio.run(run(args))
+    print(f"sessions        {r['sessions']} ({r['finished']} finished, mean {r['mean_wpm']:.0f} WPM)")
+    print(f"memory/session  idle {r['idle_kb']:.1f} KB, after reset {r['reset_kb']:.1f} KB, peak {r['peak_kb']:.1f} KB")
+    print(f"keystrokes      {r['keys']} in {r['elapsed']:.2f} s = {r['keys'] / r['elapsed']:.0f}/s "
+          f"({r['cpu'] / r['elapsed'] * 100:.0f}% CPU)")
+    print(f"events          {r['events']} = {r['events'] / r['elapsed']:.0f}/s delivered to observers")
+    if args.wpm:
+        print(f"keystroke lag   p50 {r['lag_p50_ms']:.2f} ms, p99 {r['lag_p99_ms']:.2f} ms")
+
+    failed = False
+    if r["finished"] != r["sessions"]:
+        print(f"FAILED: only {r['finished']} of {r['sessions']} sessions finished", file=sys.stderr)
+        failed = True
+    if r["peak_kb"] > args.max_session_kb:
+        print(f"REGRESSION: {r['peak_kb']:.1f} KB per session > {args.max_session_kb} KB", file=sys.stderr)
+        failed = True
+    if args.wpm and r["lag_p99_ms"] > args.max_lag_ms:
+        print(f"REGRESSION: p99 keystroke lag {r['lag_p99_ms']:.2f} ms > {args.max_lag_ms} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
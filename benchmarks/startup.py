@@ -0,0 +1,154 @@
+"""Cold-start benchmark: import time and time to first frame.
+
+Launches the app in fresh interpreters (headless, in a scratch directory)
+and measures, from process launch, how long `tui.app` takes to import and
+how long until the menu's first frame has been rendered. One extra run under
+`python -X importtime` lists the slowest imports. Exits 1 when the median
+exceeds the first-frame or import budget.
+
+Usage (from the repository root):
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --history 50000
+    python benchmarks/startup.py --budget-ms 800 --import-budget-ms 500   # tighter budgets
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAUNCH_ENV = "TYPER_TUI_STARTUP_LAUNCH"
+
+# Default budgets, measured from process launch; the floor is Textual's own
+# import and first render (about 450 ms on a slow VM)
+FIRST_FRAME_BUDGET_MS = 1000
+IMPORT_BUDGET_MS = 600
+
+
+def child(import_only=False):
+    """Runs in the launched interpreter: start the app and report timings."""
+    launched = float(os.environ[LAUNCH_ENV])
+    sys.path.insert(0, ROOT)
+    from tui.app import TyperTUIApp
+    imported = time.time()
+    if import_only:
+        # Used for the -X importtime run, so background warm-up imports are not counted
+        return
+
+    app = TyperTUIApp()
+    painted = []
+    # Note when the first frame showing the menu is written, via the app's
+    # (private) display hook; pilot.pause() alone would also wait for the
+    # background warm-up that starts right after that frame
+    original_display = app._display
+
+    def timed_display(screen, *args, **kwargs):
+        result = original_display(screen, *args, **kwargs)
+        if not painted and type(screen).__name__ == "MenuScreen":
+            painted.append(time.time())
+        return result
+
+    app._display = timed_display
+
+    async def first_frame(pilot):
+        while not painted:
+            await pilot.pause(0.01)
+        print(json.dumps({
+            "import_ms": (imported - launched) * 1000,
+            "first_frame_ms": (painted[0] - launched) * 1000,
+        }))
+        pilot.app.exit()
+
+    app.run(headless=True, auto_pilot=first_frame, size=(120, 50))
+
+
+def make_history(workdir, count):
+    with open(os.path.join(workdir, "history.jsonl"), "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "timestamp": f"2026-01-{1 + i % 28:02d}T12:00:00", "mode": "Medium", "duration": 30,
+                "wpm": 40 + i % 60, "accuracy": 95.0, "raw_wpm": 50.0,
+            }) + "\n")
+
+
+def launch(workdir, extra_args=(), child_args=()):
+    env = dict(os.environ)
+    env[LAUNCH_ENV] = repr(time.time())
+    return subprocess.run(
+        [sys.executable, *extra_args, os.path.abspath(__file__), "--child", *child_args],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def slowest_imports(stderr, top):
+    """Parse -X importtime output into (self_ms, cumulative_ms, module) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        rows.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.rstrip()))
+    own = [r for r in rows if r[2].strip().startswith("tui")]
+    return sorted(rows, reverse=True)[:top], own
+
+
+def main():
+    if "--child" in sys.argv:
+        child(import_only="--import-only" in sys.argv)
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Launches to time (default: 5)")
+    parser.add_argument("--history", type=int, default=0,
+                        help="Results to put in the scratch history first (startup should not depend on it)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list (default: 10)")
+    parser.add_argument("--budget-ms", type=float, default=FIRST_FRAME_BUDGET_MS,
+                        help=f"Fail if median time to first frame exceeds this (default: {FIRST_FRAME_BUDGET_MS})")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help=f"Fail if median import time exceeds this (default: {IMPORT_BUDGET_MS})")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="typer_startup_")
+    os.symlink(os.path.join(ROOT, "assets"), os.path.join(workdir, "assets"))
+    if args.history:
+        make_history(workdir, args.history)
+
+    # Warm the OS file cache and bytecode caches so runs are comparable
+    launch(workdir)
+
+    runs = []
+    for _ in range(args.runs):
+        result = json.loads(launch(workdir).stdout.strip().splitlines()[-1])
+        runs.append(result)
+        print(f"import {result['import_ms']:7.1f} ms   first frame {result['first_frame_ms']:7.1f} ms")
+    import_ms = statistics.median(r["import_ms"] for r in runs)
+    frame_ms = statistics.median(r["first_frame_ms"] for r in runs)
+    print(f"median import {import_ms:.1f} ms, first frame {frame_ms:.1f} ms (from process launch)")
+
+    slowest, own = slowest_imports(launch(workdir, ("-X", "importtime"), ("--import-only",)).stderr, args.top)
+    print("\nSlowest imports of tui.app by self time (ms):")
+    for self_ms, cumulative_ms, name in slowest:
+        print(f"{self_ms:8.1f} {cumulative_ms:8.1f}  {name}")
+    print("\nApplication modules (ms):")
+    for self_ms, cumulative_ms, name in own:
+        print(f"{self_ms:8.1f} {cumulative_ms:8.1f}  {name}")
+
+    failed = False
+    if frame_ms > args.budget_ms:
+        print(f"REGRESSION: first frame {frame_ms:.1f} ms > {args.budget_ms} ms", file=sys.stderr)
+        failed = True
+    if import_ms > args.import_budget_ms:
+        print(f"REGRESSION: import {import_ms:.1f} ms > {args.import_budget_ms} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""Headless keystroke-replay benchmark for the typing hot path.
+
+Drives TyperTUIApp with Textual's run_test/Pilot, replays synthetic or
+recorded keystroke streams against each asset mode (plus a large generated
+corpus) and reports per-key latency percentiles, frames rendered and memory.
+
+Usage (from the repository root):
+
+    python benchmarks/typing_hotpath.py
+    python benchmarks/typing_hotpath.py --modes Easy Stories --scenarios burst
+    python benchmarks/typing_hotpath.py --time-scale 0 --json results.json
+    python benchmarks/typing_hotpath.py --max-p99-ms 5   # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tui.app import MODES, TypingArea, TypingScreen, TyperTUIApp  # noqa: E402
+from tui.logger import Logger  # noqa: E402
+from tui.recording import KeystrokeRecording  # noqa: E402
+
+LARGE_CORPUS_WORDS = 500_000
+
+# --- Keystroke streams ---
+# A stream is a list of (delay_before_key_seconds, key) pairs. Keys use the
+# names Pilot.press understands ("space", "backspace", "ctrl+w", or a char).
+
+def _key_for(char):
+    return "space" if char == " " else char
+
+
+def stream_wpm(target, keys, wpm=150):
+    """Correct typing at a steady rate."""
+    delay = 60 / (wpm * 5)
+    return [(delay, _key_for(c)) for c in target[:keys]]
+
+
+def stream_burst(target, keys, pause=0.25):
+    """Words typed flat out, with a pause at every space (fast typists, key-repeat)."""
+    stream = []
+    for c in target[:keys]:
+        stream.append((pause if c == " " else 0.0, _key_for(c)))
+    return stream
+
+
+def stream_backspace_storm(target, keys):
+    """Runs of mistyped characters followed by backspaces and ctrl+w."""
+    rng = random.Random(0)
+    stream = []
+    typed = ""
+    while len(stream) < keys and len(typed) < len(target) - 7:
+        for _ in range(5):
+            c = target[len(typed)]
+            if rng.random() < 0.5:
+                c = rng.choice("qxzj")
+            typed += c
+            stream.append((0.0, _key_for(c)))
+        if rng.random() < 0.3:
+            stream.append((0.0, "ctrl+w"))
+            typed = typed[:-1] if typed.endswith(" ") else typed[:typed.rfind(" ") + 1]
+        else:
+            stream.extend((0.0, "backspace") for _ in range(5))
+            typed = typed[:-5]
+        # One correct character so the cursor walks through the text
+        typed += target[len(typed)]
+        stream.append((0.0, _key_for(typed[-1])))
+    return stream[:keys]
+
+
+SCENARIOS = {
+    "wpm150": stream_wpm,
+    "burst": stream_burst,
+    "backspace_storm": stream_backspace_storm,
+}
+
+
+def load_replay(path):
+    """Load a recorded stream.
+
+    Accepts a binary KeystrokeRecording (returns its stream and target text)
+    or a JSON list of [delay_seconds, key] pairs (no fixed target text).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return _recording_stream(KeystrokeRecording.from_bytes(data))
+    except (ValueError, zlib.error):
+        return [(float(delay), key) for delay, key in json.loads(data)], None
+
+
+def _recording_stream(recording):
+    stream = recording.to_key_stream()
+    final_input = ""
+    for _, final_input in recording.replay():
+        pass
+    if len(final_input) >= len(recording.target_text):
+        # Leave the last key out so the replay does not end the test
+        stream = stream[:-1]
+    return stream, recording.target_text
+
+
+def load_last_recording(history_file):
+    """Return (stream, target_text) for the newest history entry with keystrokes."""
+    for entry in Logger(history_file).iter_history_newest_first():
+        if entry.get("keystrokes"):
+            return _recording_stream(KeystrokeRecording.decode(entry["keystrokes"]))
+    raise SystemExit(f"No recorded keystrokes found in {history_file}")
+
+
+# --- Measurement ---
+
+class Timings:
+    """Wraps methods on a class with perf_counter timers for the duration of a run."""
+
+    def __init__(self):
+        self.samples = {}
+        self._patched = []
+
+    def wrap(self, cls, name, label):
+        original = cls.__dict__[name]
+        samples = self.samples.setdefault(label, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        timed.__name__ = original.__name__
+        setattr(cls, name, timed)
+        self._patched.append((cls, name, original))
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+    def restore(self):
+        for cls, name, original in reversed(self._patched):
+            setattr(cls, name, original)
+        self._patched.clear()
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": (ordered[-1] * 1000) if ordered else 0.0,
+    }
+
+
+# --- Runner ---
+
+async def run_case(mode_file, mode_name, scenario, keys, time_scale, replay, replay_target, trace_memory):
+    timings = Timings()
+    timings.wrap(TypingScreen, "on_key", "on_key")
+    timings.wrap(TypingArea, "render_content", "render_content")
+    timings.wrap(TypingScreen, "update_timer", "update_timer")
+
+    press_latency = []
+    frames = [0]
+    app = TyperTUIApp()
+    # Count frames by wrapping the app's (private) display hook when present
+    original_display = getattr(app, "_display", None)
+    if original_display is not None:
+        def counting_display(*args, **kwargs):
+            frames[0] += 1
+            return original_display(*args, **kwargs)
+        app._display = counting_display
+
+    try:
+        async with app.run_test(size=(120, 50)) as pilot:
+            await pilot.pause()
+            # A long duration keeps the test running for the whole stream
+            screen = TypingScreen(mode_file=mode_file, mode_name=mode_name, duration=3600)
+            await app.push_screen(screen)
+            await pilot.pause()
+            if replay_target is not None:
+                # Recordings replay against the exact text they were typed over
+                screen.restart_test(target_text=replay_target)
+                await pilot.pause()
+
+            target = screen.target_text
+            stream = replay if replay is not None else SCENARIOS[scenario](target, keys)
+            if replay_target is None:
+                # Never complete the text, which would push the results screen
+                stream = stream[:max(0, len(target) - 1)]
+
+            timings.reset()
+            frames[0] = 0
+            if trace_memory:
+                tracemalloc.start()
+            for delay, key in stream:
+                if delay and time_scale:
+                    await asyncio.sleep(delay * time_scale)
+                start = time.perf_counter()
+                await pilot.press(key)
+                press_latency.append(time.perf_counter() - start)
+            await pilot.pause()
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+            target_len = len(target)
+    finally:
+        timings.restore()
+
+    return {
+        "mode": mode_name,
+        "scenario": "replay" if replay is not None else scenario,
+        "target_chars": target_len,
+        "keys": len(press_latency),
+        "press": summarize(press_latency),
+        "on_key": summarize(timings.samples["on_key"]),
+        "render_content": summarize(timings.samples["render_content"]),
+        "update_timer": summarize(timings.samples["update_timer"]),
+        "frames": frames[0],
+        "traced_peak_kb": (peak / 1024) if peak is not None else None,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def make_large_corpus(directory, words):
+    rng = random.Random(42)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    path = os.path.join(directory, "large_generated.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(words):
+            f.write("".join(rng.choice(letters) for _ in range(rng.randint(2, 9))))
+            f.write("\n" if i % 12 == 11 else " ")
+    return path
+
+
+def format_row(result):
+    return (
+        f"{result['mode']:<10} {result['scenario']:<16} {result['keys']:>5} "
+        f"{result['press']['p50_ms']:>8.2f} {result['press']['p95_ms']:>8.2f} {result['press']['p99_ms']:>8.2f} "
+        f"{result['on_key']['p50_ms']:>8.3f} {result['on_key']['p99_ms']:>8.3f} {result['on_key']['max_ms']:>8.3f} "
+        f"{result['render_content']['p99_ms']:>8.3f} {result['frames']:>6} "
+        f"{(result['traced_peak_kb'] or 0):>9.0f} {result['max_rss_kb']:>9}"
+    )
+
+
+HEADER = (
+    f"{'mode':<10} {'scenario':<16} {'keys':>5} "
+    f"{'press50':>8} {'press95':>8} {'press99':>8} "
+    f"{'key50':>8} {'key99':>8} {'keymax':>8} "
+    f"{'rend99':>8} {'frames':>6} {'peak_kb':>9} {'rss_kb':>9}"
+)
+
+
+async def main_async(args):
+    # Read replay sources before leaving the caller's working directory
+    replay_source = None
+    if args.replay:
+        replay_source = load_replay(args.replay)
+    elif args.replay_last:
+        replay_source = load_last_recording(args.replay_last)
+
+    # Run inside a scratch directory so the app's history file stays out of the tree
+    workdir = tempfile.mkdtemp(prefix="typer_bench_")
+    os.symlink(os.path.join(ROOT, "assets"), os.path.join(workdir, "assets"))
+    os.chdir(workdir)
+
+    replay, replay_target = replay_source if replay_source else (None, None)
+
+    modes = [(file, name) for file, name in MODES.values()]
+    if replay_target is not None and not args.modes:
+        # The text comes from the recording; one mode is enough
+        modes = modes[:1]
+    elif not args.no_large:
+        modes.append((make_large_corpus(workdir, args.large_words), "Large"))
+    if args.modes:
+        wanted = {m.lower() for m in args.modes}
+        modes = [(f, n) for f, n in modes if n.lower() in wanted]
+    scenarios = ["replay"] if replay is not None else (args.scenarios or list(SCENARIOS))
+
+    results = []
+    print("Latencies in ms. press = Pilot key round trip, key = TypingScreen.on_key, rend = render_content")
+    print(HEADER)
+    for mode_file, mode_name in modes:
+        for scenario in scenarios:
+            result = await run_case(
+                mode_file, mode_name, scenario, args.keys, args.time_scale, replay, replay_target,
+                args.trace_memory
+            )
+            results.append(result)
+            print(format_row(result), flush=True)
+
+    if args.json:
+        with open(os.path.join(ROOT, args.json) if not os.path.isabs(args.json) else args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.max_p99_ms is not None:
+        slow = [r for r in results if r["on_key"]["p99_ms"] > args.max_p99_ms]
+        for r in slow:
+            print(f"REGRESSION: {r['mode']}/{r['scenario']} on_key p99 {r['on_key']['p99_ms']:.3f} ms "
+                  f"> {args.max_p99_ms} ms", file=sys.stderr)
+        return 1 if slow else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="*", help="Mode names to run (default: all, plus Large)")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="Streams to replay")
+    parser.add_argument("--keys", type=int, default=80, help="Keys per stream (default: 80)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier for inter-key delays; 0 replays as fast as possible")
+    parser.add_argument("--replay",
+                        help="Recorded stream: a binary keystroke recording or a JSON list of [delay_seconds, key]")
+    parser.add_argument("--replay-last", nargs="?", const="history.jsonl", metavar="HISTORY",
+                        help="Replay the newest recorded test from a history file (default: history.jsonl)")
+    parser.add_argument("--large-words", type=int, default=LARGE_CORPUS_WORDS,
+                        help="Size of the generated corpus in words")
+    parser.add_argument("--no-large", action="store_true", help="Skip the generated large corpus")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Track peak Python allocations with tracemalloc (slower)")
+    parser.add_argument("--json", help="Write full results to this JSON file")
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="Exit with status 1 if any on_key p99 exceeds this many ms")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,71 @@
+import argparse
+import os
+
 from tui.app import TyperTUIApp
 
+# Default destination of --cprofile when turned on without a path
+DEFAULT_PROFILE = "typer.prof"
+
+def env_option(name, default):
+    """Value of an environment switch taking a path: None when it is unset or
+    turned off, default when it is just turned on, otherwise the path."""
+    value = os.environ.get(name, "").strip()
+    if value.lower() in ("", "0", "false", "off", "no"):
+        return None
+    if value.lower() in ("1", "true", "on", "yes"):
+        return default
+    return value
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Typer TUI - terminal typing test")
+    parser.add_argument(
+        "--corpus", metavar="PATH",
+        help="Practice on a custom word list or text file of any size"
+    )
+    parser.add_argument(
+        "--corpus-lines", action="store_true",
+        help="Use one random line of --corpus per test instead of 100 random words"
+    )
+    parser.add_argument(
+        "--instrument", nargs="?", const="-", metavar="PATH",
+        default=env_option("TYPER_TUI_INSTRUMENT", "-"),
+        help="Time hot-path handlers and write a latency summary on exit "
+             "(to PATH, or stderr). Also enabled by TYPER_TUI_INSTRUMENT "
+             "(1, true, on or yes for stderr, or a path; 0, false, off or no disable it)."
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH",
+        default=env_option("TYPER_TUI_CPROFILE", DEFAULT_PROFILE),
+        help="Run under cProfile and dump stats to PATH. Also enabled by TYPER_TUI_CPROFILE "
+             f"(1, true, on or yes for {DEFAULT_PROFILE}, or a path)."
+    )
+    return parser.parse_args()
+
 def main():
-    app = TyperTUIApp()
-    app.run()
+    args = parse_args()
+
+    if args.instrument:
+        from tui import instrument
+        instrument.enable()
+
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    app = TyperTUIApp(corpus_path=args.corpus, corpus_lines=args.corpus_lines)
+    try:
+        app.run()
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+        if args.instrument:
+            # "-" (also what TYPER_TUI_INSTRUMENT=1 gives) means stderr;
+            # anything else is a file path
+            path = None if args.instrument in ("-", "stderr") else args.instrument
+            instrument.write_summary(path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,210 @@
+"""History analytics over columnar arrays.
+
+Results are loaded once into one array per field (time, mode code, day code,
+duration, wpm, accuracy, raw_wpm); every statistic is then computed over
+whole columns. NumPy is optional: when it is installed the work is
+vectorized, otherwise the same columns are kept as `array.array` and the
+statistics fall back to plain Python.
+"""
+import operator
+from array import array
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROLLING_WINDOWS = (10, 100)
+
+
+class HistoryColumns:
+    """History results stored column-wise, in the order they were logged."""
+
+    def __init__(self, rows):
+        self.modes = []  # mode code -> mode name
+        self.days = []   # day code -> "YYYY-MM-DD"
+        mode_codes, day_codes = {}, {}
+        day_starts = {}  # "YYYY-MM-DD" -> local midnight as epoch seconds
+
+        time_, mode, day = array("d"), array("i"), array("i")
+        duration, wpm, accuracy, raw_wpm = array("i"), array("d"), array("d"), array("d")
+        for timestamp, mode_name, dur, w, acc, raw in rows:
+            timestamp = timestamp or ""
+            day_name = timestamp[:10]
+            start = day_starts.get(day_name)
+            if start is None:
+                try:
+                    start = datetime.fromisoformat(day_name).timestamp()
+                except ValueError:
+                    continue
+                day_starts[day_name] = start
+                day_codes[day_name] = len(self.days)
+                self.days.append(day_name)
+            code = mode_codes.get(mode_name)
+            if code is None:
+                code = mode_codes[mode_name] = len(self.modes)
+                self.modes.append(mode_name)
+
+            # Only the time of day is parsed per row; the date comes from the cache above
+            clock = timestamp[11:19].split(":")
+            try:
+                seconds = int(clock[0]) * 3600 + int(clock[1]) * 60 + int(clock[2])
+            except (IndexError, ValueError):
+                seconds = 0
+
+            time_.append(start + seconds)
+            mode.append(code)
+            day.append(day_codes[day_name])
+            duration.append(dur if isinstance(dur, int) else 0)
+            wpm.append(w or 0.0)
+            accuracy.append(acc or 0.0)
+            raw_wpm.append(raw or 0.0)
+
+        if np is not None:
+            # Zero-copy views over the array buffers
+            time_, mode, day, duration, wpm, accuracy, raw_wpm = (
+                np.frombuffer(a, dtype=a.typecode) if len(a) else np.zeros(0, dtype=a.typecode)
+                for a in (time_, mode, day, duration, wpm, accuracy, raw_wpm)
+            )
+        self.time, self.mode, self.day, self.duration = time_, mode, day, duration
+        self.wpm, self.accuracy, self.raw_wpm = wpm, accuracy, raw_wpm
+
+    def __len__(self):
+        return len(self.wpm)
+
+
+def _take(values, indices):
+    if np is not None:
+        return values[indices]
+    return [values[i] for i in indices]
+
+
+def _percentile(ordered, pct):
+    # Linear interpolation between closest ranks, as numpy.percentile does
+    position = (len(ordered) - 1) * pct / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _max(values):
+    if np is not None:
+        return float(np.max(values))
+    return max(values)
+
+
+def mean(values):
+    if not len(values):
+        return 0.0
+    if np is not None:
+        return float(np.mean(values))
+    return sum(values) / len(values)
+
+
+def trend(values):
+    """Least-squares slope of values against test number, in WPM per 100 tests."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    x_mean = (n - 1) / 2
+    if np is not None:
+        x = np.arange(n) - x_mean
+        return float(np.dot(x, values - np.mean(values)) / np.dot(x, x)) * 100
+    # sum((x - x_mean) * y) over x = 0..n-1, and sum((x - x_mean) ** 2) in closed form
+    num = sum(map(operator.mul, range(n), values)) - x_mean * sum(values)
+    den = n * (n * n - 1) / 12
+    return num / den * 100
+
+
+def rolling_mean(values, window):
+    """Means of every run of `window` consecutive values (empty if too few)."""
+    n = len(values)
+    if n < window:
+        return [] if np is None else np.zeros(0)
+    if np is not None:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        return (sums[window:] - sums[:-window]) / window
+    means = []
+    total = sum(values[:window])
+    means.append(total / window)
+    for i in range(window, n):
+        total += values[i] - values[i - window]
+        means.append(total / window)
+    return means
+
+
+def describe(values):
+    """Count, mean, median, 90th percentile, best and trend of a WPM series."""
+    n = len(values)
+    if not n:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "best": 0.0, "trend": 0.0}
+    if np is not None:
+        p50, p90 = (float(p) for p in np.percentile(values, (50, 90)))
+        best = _max(values)
+    else:
+        ordered = sorted(values)
+        p50, p90 = _percentile(ordered, 50), _percentile(ordered, 90)
+        best = ordered[-1]
+    return {"count": n, "mean": mean(values), "p50": p50, "p90": p90, "best": best, "trend": trend(values)}
+
+
+def group_indices(codes, group_count):
+    """Return, per group code, the row indices of that group in logged order."""
+    if np is not None:
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes, minlength=group_count)
+        return np.split(order, np.cumsum(counts)[:-1])
+    groups = [[] for _ in range(group_count)]
+    for i, code in enumerate(codes):
+        groups[code].append(i)
+    return groups
+
+
+def group_totals(codes, values, group_count):
+    """Return per-group (counts, means, maxima) of values, indexed by group code.
+
+    Every code in range(group_count) must occur at least once.
+    """
+    if np is not None:
+        counts = np.bincount(codes, minlength=group_count)
+        means = np.bincount(codes, weights=values, minlength=group_count) / counts
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        maxima = np.maximum.reduceat(values[np.argsort(codes, kind="stable")], starts)
+        return counts.tolist(), means.tolist(), maxima.tolist()
+    counts, sums, maxima = [0] * group_count, [0.0] * group_count, [None] * group_count
+    for code, value in zip(codes, values):
+        counts[code] += 1
+        sums[code] += value
+        if maxima[code] is None or value > maxima[code]:
+            maxima[code] = value
+    return counts, [total / count for total, count in zip(sums, counts)], maxima
+
+
+def analyze(columns, recent_days=14):
+    """Compute the statistics shown on the Stats screen."""
+    overall = describe(columns.wpm)
+    overall["accuracy"] = mean(columns.accuracy)
+    for window in ROLLING_WINDOWS:
+        rolling = rolling_mean(columns.wpm, window)
+        overall[f"rolling_{window}"] = float(rolling[-1]) if len(rolling) else None
+        overall[f"best_rolling_{window}"] = _max(rolling) if len(rolling) else None
+
+    modes = []
+    for code, indices in enumerate(group_indices(columns.mode, len(columns.modes))):
+        if not len(indices):
+            continue
+        stats = describe(_take(columns.wpm, indices))
+        stats["mode"] = columns.modes[code]
+        stats["accuracy"] = mean(_take(columns.accuracy, indices))
+        modes.append(stats)
+    modes.sort(key=lambda s: -s["count"])
+
+    days = []
+    if len(columns):
+        counts, means, maxima = group_totals(columns.day, columns.wpm, len(columns.days))
+        for code, day in enumerate(columns.days):
+            days.append({"day": day, "count": counts[code], "mean": means[code], "best": maxima[code]})
+    days.sort(key=lambda d: d["day"], reverse=True)
+
+    return {"overall": overall, "modes": modes, "days": days[:recent_days]}
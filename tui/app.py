@@ -1,128 +1,324 @@
 from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer, Static, Button, Label, DataTable
+from textual.widgets import Header, Footer, Static, Button, Label, DataTable, Sparkline
 from textual.containers import Container, Horizontal, Vertical
 from textual.reactive import reactive
 from textual.screen import Screen
 from textual import events
-from rich.text import Text
+from rich.text import Span, Text
 import time
-import random
+import threading
+from functools import partial
+from bisect import bisect_right
 import os
-from .logger import Logger
+from .corpus import choice_line, get_pack, open_corpus, sample_words
+from .keyindex import KeyIndex, get_word_index, weak_keys_text
+from .logger import HistoryWriter
+from .prefetch import TextPrefetcher
+from .session import FINISHED, INPUT, RESET, STARTED, TypingSession
+
+# Mode buttons -> (asset file, display name)
+MODES = {
+    "btn_easy": ("easy.txt", "Easy"),
+    "btn_medium": ("medium.txt", "Medium"),
+    "btn_hard": ("hard.txt", "Hard"),
+    "btn_numbers": ("numbers.txt", "Numbers"),
+    "btn_symbols": ("symbols.txt", "Symbols"),
+    "btn_twisters": ("twisters.txt", "Twisters"),
+    "btn_weak": ("weak_keys", "Weak Keys"),
+    "btn_quotes": ("quotes.txt", "Quotes"),
+    "btn_stories": ("stories.txt", "Stories"),
+    "btn_zen": ("zen.txt", "Zen"),
+    "btn_code": ("code_words.txt", "Code"),
+    "btn_python": ("python.txt", "Python"),
+    "btn_terminal": ("terminal.txt", "Terminal")
+}
+
+# Line-based modes (pick one random line/snippet)
+LINE_BASED_MODES = [
+    "sentences.txt", "stories.txt", "twisters.txt",
+    "quotes.txt", "zen.txt", "python.txt", "terminal.txt"
+]
+
+# Drill built from the per-key error/latency index rather than an asset file
+WEAK_KEYS_MODE = "weak_keys"
 
 # --- Utils ---
-def _resolve_asset_path(filename):
-    """Resolve the path to an asset file, checking multiple locations."""
-    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    path = os.path.join(base_path, "..", "assets", filename)
-    
-    if not os.path.exists(path):
-        path = os.path.join("assets", filename)
-        
-    return path if os.path.exists(path) else None
-
-def load_words_from_file(filename):
-    try:
-        path = _resolve_asset_path(filename)
-        if not path:
-            return ["error", "loading", filename]
-
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            words = content.replace("\n", " ").split()
-            return words
-    except Exception as e:
-        return ["error", "loading", str(e)]
-
-def load_lines_from_file(filename):
-    try:
-        path = _resolve_asset_path(filename)
-        if not path:
-            return []
-
-        with open(path, "r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f if line.strip()]
-            return lines
-    except Exception:
-        return []
-
-def calculate_stats(start_time, total_chars, correct_chars):
-    if start_time == 0:
-        return 0, 0, 0
-    
-    elapsed = time.time() - start_time
-    if elapsed <= 0:
-        return 0, 0, 0
-    
-    minutes = elapsed / 60
-    raw_wpm = (total_chars / 5) / minutes
-    wpm = (correct_chars / 5) / minutes
-    accuracy = (correct_chars / total_chars * 100) if total_chars > 0 else 100
-    
-    return wpm, accuracy, raw_wpm
+def generate_target_text(mode_file, corpus_path=None, corpus_lines=False, key_index=None):
+    """Build the text for one test in the given mode."""
+    if mode_file == WEAK_KEYS_MODE:
+        text = weak_keys_text(key_index, 100)
+        return text if text else "Error loading words."
+
+    if corpus_path and mode_file == corpus_path:
+        # Custom --corpus file, sampled without loading the whole file
+        try:
+            corpus = open_corpus(mode_file)
+        except OSError:
+            return "Error loading corpus."
+        if corpus_lines:
+            line = corpus.choice_line()
+            return line if line else "Error loading content."
+        words = corpus.sample_words(100)
+        return " ".join(words) if words else "Error loading words."
+
+    if mode_file in LINE_BASED_MODES:
+        # Pick a random line/story
+        line = choice_line(mode_file)
+        return line.strip() if line else "Error loading content."
+
+    # Up to 100 words, fewer if the asset is smaller
+    words = sample_words(mode_file, 100)
+    return " ".join(words) if words else "Error loading words."
 
 # --- Widgets ---
 
 class TypingArea(Static):
-    """Widget to display typed text with coloring."""
-    
+    """Widget to display typed text with coloring.
+
+    The styled buffer is kept between keystrokes: only the characters that
+    changed since the last call are restyled, and adjacent characters with
+    the same style are merged into a single run.
+
+    When `window_lines` is set, the text is wrapped to the widget width and
+    only that many lines around the cursor are rendered, so the cost of a
+    render does not grow with the length of the text.
+    """
+
+    STYLE_CORRECT = "green"
+    STYLE_WRONG = "red"
+    STYLE_WRONG_SPACE = "bold red"
+    STYLE_CURSOR = "reverse bold white"
+    STYLE_PENDING = "dim white"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._target = None
+        self._typed = ""
+        # Displayed characters, one per list item so an edit only replaces
+        # the characters it touches
+        self._plain = []
+        # Runs over the typed region as [start, end, style], merged when contiguous
+        self._runs = []
+        self.window_lines = None
+        self.lines_before_cursor = 1
+        self._line_starts = [0]
+        self._wrap_width = 0
+
+    def _reset(self, target_text: str):
+        self._target = target_text
+        self._typed = ""
+        self._plain = list(target_text)
+        self._runs = []
+        self._line_starts = [0]
+
+    def _extend(self, target_text: str):
+        """Target grew at the end (endless mode): keep the existing styling."""
+        self._plain.extend(target_text[len(self._target):])
+        self._target = target_text
+
+    def _wrap(self, width: int):
+        """Update line start offsets for the target, wrapping at spaces."""
+        if width != self._wrap_width:
+            self._wrap_width = width
+            self._line_starts = [0]
+        # Earlier breaks never change when text is appended, so only the
+        # last line onwards needs wrapping
+        target = self._target
+        starts = self._line_starts
+        pos = starts[-1]
+        while len(target) - pos > width:
+            brk = target.rfind(" ", pos, pos + width)
+            # Break after the space so it stays typeable at the end of the line
+            pos = brk + 1 if brk >= pos else pos + width
+            starts.append(pos)
+
+    def _truncate(self, length: int):
+        """Drop styling for every typed character at index >= length."""
+        runs = self._runs
+        while runs and runs[-1][0] >= length:
+            runs.pop()
+        if runs and runs[-1][1] > length:
+            runs[-1][1] = length
+
+    def _char_style(self, typed_char: str, target_char: str) -> str:
+        if typed_char == target_char:
+            return self.STYLE_CORRECT
+        return self.STYLE_WRONG_SPACE if target_char == " " else self.STYLE_WRONG
+
+    def on_resize(self, event) -> None:
+        if self.window_lines and self._target is not None:
+            self.render_content(self._target, self._typed)
+
     def render_content(self, target_text: str, user_input: str):
-        display = Text()
-        
-        for i, char in enumerate(target_text):
-            if i < len(user_input):
-                if user_input[i] == char:
-                    display.append(char, style="green")
-                else:
-                    if char == " ":
-                        display.append("_", style="bold red")
-                    else:
-                        display.append(char, style="red")
-            elif i == len(user_input):
-                display.append(char, style="reverse bold white")
+        if target_text != self._target:
+            if self._target and target_text.startswith(self._target):
+                self._extend(target_text)
             else:
-                display.append(char, style="dim white")
-                
-        self.update(display)
+                self._reset(target_text)
+
+        old_typed = self._typed
+        # Length of the unchanged typed prefix. Usually a key was added or
+        # removed at the end; only an edit further back needs the scan
+        if user_input.startswith(old_typed):
+            common = len(old_typed)
+        elif old_typed.startswith(user_input):
+            common = len(user_input)
+        else:
+            common = 0
+            for common, (a, b) in enumerate(zip(old_typed, user_input)):
+                if a != b:
+                    break
+
+        self._truncate(common)
+        runs = self._runs
+        new_chars = []
+        for i in range(common, len(user_input)):
+            target_char = target_text[i]
+            style = self._char_style(user_input[i], target_char)
+            new_chars.append("_" if style == self.STYLE_WRONG_SPACE else target_char)
+            if runs and runs[-1][1] == i and runs[-1][2] == style:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1, style])
+
+        # Only the region between the common prefix and the old/new cursor changes
+        dirty_end = max(len(old_typed), len(user_input))
+        new_chars.extend(target_text[len(user_input):dirty_end])
+        self._plain[common:dirty_end] = new_chars
+        self._typed = user_input
+
+        width = self.content_size.width
+        if self.window_lines and width > 0:
+            self.update(self._render_window(width))
+        else:
+            self.update(Text("".join(self._plain), spans=self._spans(0, len(target_text))))
+
+    def _spans(self, start: int, end: int):
+        """Spans clipped to [start, end) and shifted so start becomes 0."""
+        spans = []
+        # Runs end at the cursor, so walk back from it until leaving the range
+        for run_start, run_end, style in reversed(self._runs):
+            if run_end <= start:
+                break
+            if run_start < end:
+                spans.append(Span(max(run_start, start) - start, min(run_end, end) - start, style))
+        spans.reverse()
+
+        cursor = len(self._typed)
+        if start <= cursor < end:
+            spans.append(Span(cursor - start, cursor - start + 1, self.STYLE_CURSOR))
+        pending = max(cursor + 1, start)
+        if pending < end:
+            spans.append(Span(pending - start, end - start, self.STYLE_PENDING))
+        return spans
+
+    def _render_window(self, width: int):
+        self._wrap(width)
+        starts = self._line_starts
+        cursor_line = bisect_right(starts, len(self._typed)) - 1
+        first = max(0, cursor_line - self.lines_before_cursor)
+        last = min(len(starts), first + self.window_lines)
+
+        lines = []
+        for k in range(first, last):
+            start = starts[k]
+            end = starts[k + 1] if k + 1 < len(starts) else len(self._target)
+            lines.append(Text("".join(self._plain[start:end]), spans=self._spans(start, end)))
+        return Text("\n").join(lines)
 
 class StatsWidget(Static):
-    wpm = reactive(0.0)
+    wpm = reactive(0)
     time_left = reactive(0)
     
     def render(self):
         return f"WPM: {self.wpm:.0f} | Time: {self.time_left}s"
 
+    def show(self, wpm, time_left):
+        # Reactives only refresh when the displayed (rounded) value changes
+        self.wpm = round(wpm)
+        self.time_left = int(time_left)
+
 # --- Screens ---
 
 class HistoryScreen(Screen):
     BINDINGS = [("escape", "app.pop_screen", "Back")]
-    
+
+    # Rows are fetched from the history backend one page at a time, as the
+    # user scrolls or moves the cursor near the end of what is loaded
+    PAGE_SIZE = 100
+    PREFETCH_MARGIN = 20
+
     def on_mount(self):
         table = self.query_one(DataTable)
         table.add_columns("Date", "Mode", "Duration", "WPM", "Acc %", "Raw WPM")
-        
-        logger = Logger()
-        history = logger.get_history()
-        
-        # Sort by date desc
-        history.reverse()
-        
-        for entry in history:
-            # Format timestamp
-            ts = entry.get("timestamp", "")
-            try:
-                dt = ts.split("T")[0] + " " + ts.split("T")[1][:5]
-            except (IndexError, ValueError):
-                dt = ts
-                
-            table.add_row(
-                dt,
-                entry.get("mode", "?"),
-                str(entry.get("duration", "?")),
-                str(entry.get("wpm", 0)),
-                str(entry.get("accuracy", 0)),
-                str(entry.get("raw_wpm", 0))
-            )
+
+        # Newest first, read lazily; opened by the first page load
+        self._history = None
+        self._exhausted = False
+        self._loading = False
+
+        self.load_page()
+        self.watch(table, "scroll_y", self._on_table_scroll, init=False)
+
+    def load_page(self):
+        if self._exhausted or self._loading:
+            return
+        # Opening the history can wait on disk or on a lock held by another
+        # instance, so pages are read off the UI thread, one at a time
+        self._loading = True
+        threading.Thread(target=self.read_page, name="history-page", daemon=True).start()
+
+    def read_page(self):
+        rows = []
+        exhausted = False
+        try:
+            if self._history is None:
+                # Make sure results still queued for writing are included
+                self.app.history_writer.flush()
+                self._history = self.app.history_writer.logger.iter_history_newest_first()
+            for entry in self._history:
+                rows.append(self.format_row(entry))
+                if len(rows) >= self.PAGE_SIZE:
+                    break
+            else:
+                exhausted = True
+        except Exception as e:
+            self.app.report_error(f"Could not load history: {e}")
+            exhausted = True
+        self.app.call_from_thread(self.add_page, rows, exhausted)
+
+    def add_page(self, rows, exhausted):
+        self._loading = False
+        self._exhausted = exhausted
+        if rows and self.is_attached:
+            self.query_one(DataTable).add_rows(rows)
+
+    @staticmethod
+    def format_row(entry):
+        # Format timestamp
+        ts = entry.get("timestamp", "")
+        try:
+            dt = ts.split("T")[0] + " " + ts.split("T")[1][:5]
+        except (IndexError, ValueError):
+            dt = ts
+            
+        return (
+            dt,
+            entry.get("mode", "?"),
+            str(entry.get("duration", "?")),
+            str(entry.get("wpm", 0)),
+            str(entry.get("accuracy", 0)),
+            str(entry.get("raw_wpm", 0))
+        )
+
+    def _on_table_scroll(self, scroll_y):
+        table = self.query_one(DataTable)
+        if scroll_y >= table.max_scroll_y - self.PREFETCH_MARGIN:
+            self.load_page()
+
+    def on_data_table_row_highlighted(self, event: DataTable.RowHighlighted):
+        if event.cursor_row >= event.data_table.row_count - self.PREFETCH_MARGIN:
+            self.load_page()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -137,6 +333,85 @@ class HistoryScreen(Screen):
     def on_button_pressed(self, event: Button.Pressed):
         self.app.pop_screen()
 
+class StatsScreen(Screen):
+    BINDINGS = [("escape", "app.pop_screen", "Back")]
+
+    def on_mount(self):
+        self.query_one("#stats_modes", DataTable).add_columns(
+            "Mode", "Tests", "Avg WPM", "Median", "P90", "Best", "Acc %", "Trend/100"
+        )
+        self.query_one("#stats_days", DataTable).add_columns("Date", "Tests", "Avg WPM", "Best")
+
+        # Loading and analysing a long history happens off the UI thread
+        threading.Thread(target=self.load_report, name="stats-load", daemon=True).start()
+
+    def load_report(self):
+        try:
+            # Imported here: NumPy, when installed, is slow to import and only this screen needs it
+            from . import analytics
+            # Make sure results still queued for writing are included
+            self.app.history_writer.flush()
+            columns = analytics.HistoryColumns(self.app.history_writer.logger.get_result_rows())
+            report = analytics.analyze(columns)
+        except Exception as e:
+            self.app.report_error(f"Could not load statistics: {e}")
+            self.app.call_from_thread(self.show_message, "Statistics are unavailable.")
+            return
+        self.app.call_from_thread(self.show_report, report)
+
+    def show_message(self, message):
+        if self.is_attached:
+            self.query_one("#stats_overview", Static).update(message)
+
+    def show_report(self, report):
+        if not self.is_attached:
+            return
+        overall = report["overall"]
+        if not overall["count"]:
+            self.show_message("No results yet. Finish a test to see statistics.")
+            return
+
+        def rolling(window):
+            last = overall[f"rolling_{window}"]
+            if last is None:
+                return "-"
+            return f"{last:.1f} (best {overall[f'best_rolling_{window}']:.1f})"
+
+        self.query_one("#stats_overview", Static).update(
+            f"Tests: {overall['count']}   Avg: {overall['mean']:.1f}   Median: {overall['p50']:.1f}   "
+            f"P90: {overall['p90']:.1f}   Best: {overall['best']:.1f}   Accuracy: {overall['accuracy']:.1f}%\n"
+            f"Last 10 avg: {rolling(10)}   Last 100 avg: {rolling(100)}   "
+            f"Trend: {overall['trend']:+.1f} WPM per 100 tests"
+        )
+        self.query_one("#stats_modes", DataTable).add_rows(
+            (
+                str(m["mode"]), str(m["count"]), f"{m['mean']:.1f}", f"{m['p50']:.1f}", f"{m['p90']:.1f}",
+                f"{m['best']:.1f}", f"{m['accuracy']:.1f}", f"{m['trend']:+.1f}"
+            )
+            for m in report["modes"]
+        )
+        self.query_one("#stats_days", DataTable).add_rows(
+            (d["day"], str(d["count"]), f"{d['mean']:.1f}", f"{d['best']:.1f}")
+            for d in report["days"]
+        )
+
+    def compose(self) -> ComposeResult:
+        yield Header()
+        yield Container(
+            Label("Statistics", classes="heading"),
+            Static("Loading...", id="stats_overview"),
+            Label("By Mode", classes="section_title"),
+            DataTable(id="stats_modes"),
+            Label("Recent Days", classes="section_title"),
+            DataTable(id="stats_days"),
+            Button("Back (Esc)", variant="primary", id="back_btn"),
+            id="stats_container"
+        )
+        yield Footer()
+
+    def on_button_pressed(self, event: Button.Pressed):
+        self.app.pop_screen()
+
 class MenuScreen(Screen):
     """Main Menu to select mode and settings."""
     BINDINGS = [("q", "quit", "Quit")]
@@ -159,6 +434,7 @@ class MenuScreen(Screen):
                 Button("Numbers", id="btn_numbers", classes="mode_btn"),
                 Button("Symbols", id="btn_symbols", classes="mode_btn"),
                 Button("Twisters", id="btn_twisters", classes="mode_btn"),
+                Button("Weak Keys", id="btn_weak", classes="mode_btn"),
                 classes="btn_row"
             ),
             Label("Creative:", classes="section_title"),
@@ -185,6 +461,8 @@ class MenuScreen(Screen):
             ),
             Horizontal(
                 Button("View History", id="btn_history", variant="success"),
+                Button("Stats", id="btn_stats"),
+                Button("Endless: Off", id="btn_endless"),
                 Button("Start Test", id="btn_start", variant="primary"),
                 classes="action_row"
             ),
@@ -196,45 +474,54 @@ class MenuScreen(Screen):
         self.selected_mode = "medium.txt"
         self.selected_mode_name = "Medium"
         self.selected_time = 30
+        self.endless = False
         
         # Highlight defaults
-        self.query_one("#btn_medium").add_class("selected")
         self.query_one("#time_30").add_class("selected")
+        if self.app.corpus_path:
+            # A --corpus file is preselected until another mode is picked
+            self.selected_mode = self.app.corpus_path
+            self.selected_mode_name = "Custom"
+            self.notify(f"Custom corpus: {os.path.basename(self.app.corpus_path)}")
+        else:
+            self.query_one("#btn_medium").add_class("selected")
+        # Start generating texts once the menu has been drawn
+        self.call_after_refresh(self.app.prefetcher.set_mode, self.selected_mode)
 
     def on_button_pressed(self, event: Button.Pressed):
         btn_id = event.button.id
         
         if btn_id == "btn_start":
-            self.app.push_screen(TypingScreen(
+            # The typing screen is created once and reset for every test
+            screen = self.app.get_screen("typing")
+            screen.configure(
                 mode_file=self.selected_mode,
-                mode_name=self.selected_mode_name,
-                duration=self.selected_time
-            ))
+                mode_name=f"{self.selected_mode_name} (Endless)" if self.endless else self.selected_mode_name,
+                duration=self.selected_time,
+                endless=self.endless
+            )
+            self.app.push_screen(screen)
         
         elif btn_id == "btn_history":
             self.app.push_screen(HistoryScreen())
+
+        elif btn_id == "btn_stats":
+            self.app.push_screen(StatsScreen())
+
+        elif btn_id == "btn_endless":
+            # Toggle: text keeps growing so only the timer ends the test
+            self.endless = not self.endless
+            event.button.label = "Endless: On" if self.endless else "Endless: Off"
+            event.button.set_class(self.endless, "selected")
             
         elif btn_id.startswith("btn_"):
             # Mode selection
             self.query(".mode_btn").remove_class("selected")
             event.button.add_class("selected")
             
-            modes = {
-                "btn_easy": ("easy.txt", "Easy"),
-                "btn_medium": ("medium.txt", "Medium"),
-                "btn_hard": ("hard.txt", "Hard"),
-                "btn_numbers": ("numbers.txt", "Numbers"),
-                "btn_symbols": ("symbols.txt", "Symbols"),
-                "btn_twisters": ("twisters.txt", "Twisters"),
-                "btn_quotes": ("quotes.txt", "Quotes"),
-                "btn_stories": ("stories.txt", "Stories"),
-                "btn_zen": ("zen.txt", "Zen"),
-                "btn_code": ("code_words.txt", "Code"),
-                "btn_python": ("python.txt", "Python"),
-                "btn_terminal": ("terminal.txt", "Terminal")
-            }
-            if btn_id in modes:
-                self.selected_mode, self.selected_mode_name = modes[btn_id]
+            if btn_id in MODES:
+                self.selected_mode, self.selected_mode_name = MODES[btn_id]
+                self.app.prefetcher.set_mode(self.selected_mode)
                 
         elif btn_id.startswith("time_"):
             # Time selection
@@ -254,11 +541,11 @@ class MenuScreen(Screen):
         # Define Rows - Must match compose() layout
         rows = [
             ["btn_easy", "btn_medium", "btn_hard"],        # Row 0: Difficulty
-            ["btn_numbers", "btn_symbols", "btn_twisters"], # Row 1: Special
+            ["btn_numbers", "btn_symbols", "btn_twisters", "btn_weak"], # Row 1: Special
             ["btn_quotes", "btn_stories", "btn_zen"],       # Row 2: Creative
             ["btn_code", "btn_python", "btn_terminal"],     # Row 3: Developer
             ["time_15", "time_30", "time_60", "time_120"], # Row 4: Duration
-            ["btn_history", "btn_start"]                   # Row 5: Actions
+            ["btn_history", "btn_stats", "btn_endless", "btn_start"]  # Row 5: Actions
         ]
         
         # Find current position
@@ -287,26 +574,14 @@ class MenuScreen(Screen):
             if current_row < len(rows) - 1:
                 next_row = rows[current_row + 1]
                 next_col = min(current_col, len(next_row) - 1)
-                
-                # Special mapping for Duration -> Actions transition
-                if current_row == 4:  # Duration row (4 items) to Actions (2 items)
-                    if current_col <= 1: next_col = 0  # 15s/30s -> History
-                    else: next_col = 1                  # 60s/120s -> Start
-                
                 next_id = next_row[next_col]
                 self.query_one(f"#{next_id}").focus()
                 
         elif key == "up":
             if current_row > 0:
                 next_row = rows[current_row - 1]
-                
-                # Special mapping for Actions -> Duration transition
-                if current_row == 5:  # Actions (2 items) to Duration (4 items)
-                    if current_col == 0: next_col = 0  # History -> 15s
-                    else: next_col = 3                  # Start -> 120s
-                else:
-                    next_col = min(current_col, len(next_row) - 1)
-                    
+                # Duration and Actions both have 4 items, so columns line up
+                next_col = min(current_col, len(next_row) - 1)
                 next_id = next_row[next_col]
                 self.query_one(f"#{next_id}").focus()
 
@@ -317,13 +592,13 @@ class ResultsScreen(Screen):
         ("escape", "menu", "Menu") # Escape goes to menu
     ]
     
-    def __init__(self, wpm, accuracy, raw_wpm, mode_name, duration, **kwargs):
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.wpm = wpm
-        self.accuracy = accuracy
-        self.raw_wpm = raw_wpm
-        self.mode_name = mode_name
-        self.duration = duration
+        self.wpm = 0
+        self.accuracy = 0
+        self.raw_wpm = 0
+        self.raw_series = []
+        self.error_series = []
 
     def compose(self) -> ComposeResult:
         yield Container(
@@ -331,21 +606,28 @@ class ResultsScreen(Screen):
             Horizontal(
                 Vertical(
                     Label("WPM", classes="stat_title"),
-                    Label(f"{self.wpm:.0f}", classes="stat_value"),
+                    Label(f"{self.wpm:.0f}", id="result_wpm", classes="stat_value"),
                     classes="stat_box"
                 ),
                 Vertical(
                     Label("Accuracy", classes="stat_title"),
-                    Label(f"{self.accuracy:.0f}%", classes="stat_value"),
+                    Label(f"{self.accuracy:.0f}%", id="result_accuracy", classes="stat_value"),
                     classes="stat_box"
                 ),
                 Vertical(
                     Label("Raw", classes="stat_title"),
-                    Label(f"{self.raw_wpm:.0f}", classes="stat_value"),
+                    Label(f"{self.raw_wpm:.0f}", id="result_raw", classes="stat_value"),
                     classes="stat_box"
                 ),
                 id="stats_row"
             ),
+            Vertical(
+                Label(self.raw_caption(), id="timeline_raw_title", classes="stat_title"),
+                Sparkline(self.raw_series, id="timeline_raw"),
+                Label(self.error_caption(), id="timeline_errors_title", classes="stat_title"),
+                Sparkline(self.error_series, id="timeline_errors"),
+                id="timeline_box"
+            ),
             Horizontal(
                 Button("Restart (Enter)", id="restart_btn", variant="primary"),
                 Button("Menu (M)", id="menu_btn", variant="default"),
@@ -354,15 +636,41 @@ class ResultsScreen(Screen):
             id="results_box"
         )
     
-    def on_mount(self):
-        # Log results
-        logger = Logger()
-        logger.log_result(
-            self.mode_name,
-            self.duration,
-            self.wpm,
-            self.accuracy,
-            self.raw_wpm
+    def raw_caption(self):
+        if not self.raw_series:
+            return "Raw WPM per second"
+        return f"Raw WPM per second (peak {max(self.raw_series)})"
+
+    def error_caption(self):
+        return f"Errors per second ({sum(self.error_series)} total)"
+
+    def show_results(self, wpm, accuracy, raw_wpm, mode_name, duration, recording=None, timeline=None):
+        """Fill in a finished test; the same screen is reused for every result."""
+        self.wpm = wpm
+        self.accuracy = accuracy
+        self.raw_wpm = raw_wpm
+        self.raw_series = timeline.series("raw_wpm") if timeline is not None else []
+        self.error_series = timeline.series("errors") if timeline is not None else []
+        if self.is_mounted:
+            self.query_one("#result_wpm", Label).update(f"{wpm:.0f}")
+            self.query_one("#result_accuracy", Label).update(f"{accuracy:.0f}%")
+            self.query_one("#result_raw", Label).update(f"{raw_wpm:.0f}")
+            self.query_one("#timeline_raw_title", Label).update(self.raw_caption())
+            self.query_one("#timeline_raw", Sparkline).data = self.raw_series
+            self.query_one("#timeline_errors_title", Label).update(self.error_caption())
+            self.query_one("#timeline_errors", Sparkline).data = self.error_series
+            # As on a fresh screen, Enter restarts
+            self.set_focus(self.query_one("#restart_btn"))
+
+        # Log results in the background
+        self.app.history_writer.log_result(
+            mode_name,
+            duration,
+            wpm,
+            accuracy,
+            raw_wpm,
+            recording=recording,
+            timeline=timeline
         )
 
     def on_key(self, event: events.Key):
@@ -408,29 +716,51 @@ class ResultsScreen(Screen):
         self.app.pop_screen()
 
 class TypingScreen(Screen):
+    """View over a `TypingSession`: forwards keys to it and redraws on its events."""
+
     BINDINGS = [
         ("ctrl+r", "restart_test", "Restart"),
         ("ctrl+w", "delete_word", "Delete Word"),
         ("escape", "back_to_menu", "Menu"),
     ]
 
-    def __init__(self, mode_file="medium.txt", mode_name="Medium", duration=30, **kwargs):
+    # Endless mode: show this many lines of text
+    ENDLESS_WINDOW_LINES = 5
+    # Input is applied immediately; redraws are coalesced to one per frame
+    FRAME_INTERVAL = 1 / 60
+    # Shortest wait between stats display ticks
+    MIN_TICK = 0.1
+
+    def __init__(self, mode_file="medium.txt", mode_name="Medium", duration=30, endless=False, **kwargs):
         super().__init__(**kwargs)
         self.mode_file = mode_file
         self.mode_name = mode_name
-        self.test_duration = duration
-        
-        self.target_text = ""
-        self.user_input = ""
-        self.start_time = 0
-        self.test_running = False
-        self.timer_handle = None
+        self.session = TypingSession(self.next_text, duration, endless)
+        self.session.add_listener(self.on_session_event)
+
+        self.tick_handle = None
+        self.typing_area = None
+        self._render_timer = None
+        self._last_render = 0.0
+
+    # Read-only views of the session state
+    @property
+    def target_text(self):
+        return self.session.target_text
+
+    @property
+    def user_input(self):
+        return self.session.user_input
+
+    @property
+    def test_running(self):
+        return self.session.running
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield Container(
             Horizontal(
-                Label(f"Mode: {self.mode_name}", classes="info_label"),
+                Label(f"Mode: {self.mode_name}", id="mode_label", classes="info_label"),
                 StatsWidget(id="stats"),
                 classes="top_bar"
             ),
@@ -441,129 +771,227 @@ class TypingScreen(Screen):
         yield Footer()
 
     def on_mount(self) -> None:
+        self.typing_area = self.query_one(TypingArea)
+        self.session.key_index = self.app.key_index
+        self.apply_mode()
         self.restart_test()
 
+    def configure(self, mode_file, mode_name, duration, endless=False):
+        """Set up the next test. The screen is installed once and reused, so
+        a new test only resets state in place instead of rebuilding widgets."""
+        self.mode_file = mode_file
+        self.mode_name = mode_name
+        self.session.duration = duration
+        self.session.endless = endless
+        if self.typing_area is not None:
+            self.apply_mode()
+            self.restart_test()
+
+    def apply_mode(self):
+        self.query_one("#mode_label", Label).update(f"Mode: {self.mode_name}")
+        self.typing_area.window_lines = self.ENDLESS_WINDOW_LINES if self.session.endless else None
+
+    def next_text(self):
+        # Usually ready in the prefetch queue; generate inline otherwise
+        return self.app.prefetcher.pop(self.mode_file) or self.app.generate_target_text(self.mode_file)
+
     def action_back_to_menu(self):
+        # The screen outlives being popped: don't let a test run on behind the
+        # menu. Only leaving ends it; overlays such as the command palette don't
+        if self.session.running:
+            self.session.cancel()
+            self.stop_timers()
         self.app.pop_screen()
 
-    def restart_test(self) -> None:
-        if self.timer_handle:
-            self.timer_handle.stop()
-            
-        # Line-based modes (pick one random line/snippet)
-        line_based_modes = [
-            "sentences.txt", "stories.txt", "twisters.txt",
-            "quotes.txt", "zen.txt", "python.txt", "terminal.txt"
-        ]
-        
-        if self.mode_file in line_based_modes:
-             words_or_lines = load_lines_from_file(self.mode_file)
-             if not words_or_lines:
-                 self.target_text = "Error loading content."
-             else:
-                 # Pick a random line/story
-                 self.target_text = random.choice(words_or_lines).strip()
-        else:
-            all_words = load_words_from_file(self.mode_file)
-            # Ensure we have enough words
-            sample_size = min(100, len(all_words))
-            if sample_size == 0:
-                self.target_text = "Error loading words."
-            else:
-                self.target_text = " ".join(random.sample(all_words, sample_size))
-            
-        self.user_input = ""
-        self.start_time = 0
-        self.test_running = False
-        
-        self.query_one("#stats").time_left = self.test_duration
-        self.query_one("#stats").wpm = 0
-        self.query_one("#instruction").update("Start typing to begin...")
-        self.query_one("#stats").update(f"WPM: 0 | Time: {self.test_duration}s")
-        
-        self.query_one(TypingArea).render_content(self.target_text, "")
-        self.set_focus(None)
+    def restart_test(self, target_text=None) -> None:
+        self.session.reset(target_text)
 
     def on_key(self, event: events.Key) -> None:
         if event.key == "ctrl+r":
             self.restart_test()
             return
-            
+
         if event.key == "escape":
             self.action_back_to_menu()
             return
 
-        # Start timer
-        if not self.test_running and ((event.character and event.character.isprintable()) or event.key == "space"):
-            self.start_test()
-
+        session = self.session
         if event.key == "backspace":
-            if len(self.user_input) > 0:
-                self.user_input = self.user_input[:-1]
-                
+            session.backspace()
         elif event.key == "ctrl+w" or event.key == "ctrl+h":
-            if not self.user_input:
-                return
-
-            if self.user_input.endswith(" "):
-                 self.user_input = self.user_input[:-1]
-            else:
-                last_space = self.user_input.rfind(" ")
-                if last_space == -1:
-                    self.user_input = ""
-                else:
-                    self.user_input = self.user_input[:last_space+1]
-
+            session.delete_word()
         elif event.character:
-             if len(self.user_input) < len(self.target_text):
-                 self.user_input += event.character
-
-        self.query_one(TypingArea).render_content(self.target_text, self.user_input)
-        
-        if len(self.user_input) >= len(self.target_text):
+            session.type_char(event.character)
+
+    def on_paste(self, event: events.Paste) -> None:
+        # The whole paste is applied as one batch with a single redraw
+        if not self.session.running:
+            self.notify("Type the first key to start; pasting doesn't start the test.")
+        self.session.type_text(event.text)
+
+    def on_session_event(self, event):
+        if event == INPUT:
+            if self.session.is_accepting_input():
+                self.request_render()
+            else:
+                # Show the final state before the results screen covers it
+                self.render_now()
+        elif event == STARTED:
+            self.tick_handle = self.set_timer(self.next_tick_delay(), self.update_timer)
+            self.query_one("#instruction").update("Go!")
+        elif event == FINISHED:
             self.finish_test()
+        elif event == RESET:
+            self.stop_timers()
+            self.query_one(StatsWidget).show(0, self.session.duration)
+            self.query_one("#instruction").update("Start typing to begin...")
+            self.render_now()
+            self.set_focus(None)
+
+    def request_render(self):
+        if self._render_timer is not None:
+            # A frame is already scheduled and will draw the latest input
+            return
+        wait = self._last_render + self.FRAME_INTERVAL - time.perf_counter()
+        if wait <= 0:
+            self.render_now()
+        else:
+            self._render_timer = self.set_timer(wait, self.render_now)
+
+    def render_now(self):
+        if self._render_timer is not None:
+            self._render_timer.stop()
+            self._render_timer = None
+        self._last_render = time.perf_counter()
+        self.typing_area.render_content(self.session.target_text, self.session.user_input)
+        if self.session.running:
+            # Typing changes WPM; the widget only repaints if the shown value moved
+            self.refresh_stats()
+
+    def stop_timers(self):
+        if self.tick_handle:
+            self.tick_handle.stop()
+        self.tick_handle = None
+
+    def next_tick_delay(self):
+        """Seconds until the countdown or the idle WPM display would change."""
+        session = self.session
+        now = time.monotonic()
+        remaining = session.deadline - now
+        # Next whole-second boundary of the countdown
+        delay = (remaining - int(remaining)) or 1.0
+
+        # While idle, WPM = 12 * correct / elapsed falls over time; wake when
+        # it crosses the next rounding boundary
+        elapsed = now - session.start_time
+        correct = session.stats.correct
+        if correct and elapsed > 0:
+            shown = round(12 * correct / elapsed)
+            if shown > 0:
+                delay = min(delay, 12 * correct / (shown - 0.5) - elapsed)
+        # Never wake more often than the old fixed 100 ms interval
+        return max(delay, self.MIN_TICK) + 0.001
 
-    def start_test(self):
-        self.test_running = True
-        self.start_time = time.time()
-        self.timer_handle = self.set_interval(0.1, self.update_timer)
-        self.query_one("#instruction").update("Go!")
-        
     def update_timer(self):
-        elapsed = time.time() - self.start_time
-        remaining = self.test_duration - elapsed
-        
-        wpm, _, _ = self.calculate_current_stats()
-        self.query_one("#stats").wpm = wpm
-        self.query_one("#stats").time_left = int(remaining)
-        self.query_one("#stats").update(f"WPM: {wpm:.0f} | Time: {int(remaining)}s")
+        self.tick_handle = None
+        if not self.session.running:
+            return
+        self.refresh_stats()
+        self.tick_handle = self.set_timer(self.next_tick_delay(), self.update_timer)
 
-        if remaining <= 0:
-            self.finish_test()
+    def refresh_stats(self):
+        now = time.monotonic()
+        wpm, _, _ = self.session.current_stats(now)
+        self.query_one(StatsWidget).show(wpm, self.session.remaining(now))
 
     def finish_test(self):
-        if self.timer_handle:
-            self.timer_handle.stop()
-        self.test_running = False
-        
-        wpm, accuracy, raw_wpm = self.calculate_current_stats()
-        self.app.push_screen(ResultsScreen(
-            wpm=wpm, 
-            accuracy=accuracy, 
+        """End the test (if still running) and show the results."""
+        session = self.session
+        if not session.finished:
+            # Finishing emits FINISHED, which calls back into here
+            session.finish()
+            return
+        self.stop_timers()
+        self.app.save_key_index()
+        if session.result is None:
+            # Finished within a moment of the first key: no meaningful result
+            self.notify("Too quick to count; the test was not saved.", severity="warning")
+            self.restart_test()
+            return
+        wpm, accuracy, raw_wpm = session.result
+        results = self.app.get_screen("results")
+        results.show_results(
+            wpm=wpm,
+            accuracy=accuracy,
             raw_wpm=raw_wpm,
             mode_name=self.mode_name,
-            duration=self.test_duration
-        ))
-
-    def calculate_current_stats(self):
-        correct_chars = 0
-        for i, char in enumerate(self.user_input):
-            if i < len(self.target_text) and char == self.target_text[i]:
-                correct_chars += 1
-        return calculate_stats(self.start_time, len(self.user_input), correct_chars)
+            duration=session.duration,
+            recording=session.recording,
+            timeline=session.timeline
+        )
+        self.app.push_screen(results)
 
 class TyperTUIApp(App):
     CSS_PATH = "typer_tui.css"
+    # Created on first use, then reused for every test
+    SCREENS = {"typing": TypingScreen, "results": ResultsScreen}
+
+    def __init__(self, corpus_path=None, corpus_lines=False, **kwargs):
+        super().__init__(**kwargs)
+        # Optional custom corpus (--corpus); sampled at random offsets
+        self.corpus_path = os.path.abspath(corpus_path) if corpus_path else None
+        self.corpus_lines = corpus_lines
+        self._key_index = None
+        self._key_index_lock = threading.Lock()
+
+    @property
+    def key_index(self):
+        """Per-key error/latency counts, loaded on first use (or by warm_up)."""
+        if self._key_index is None:
+            with self._key_index_lock:
+                if self._key_index is None:
+                    self._key_index = KeyIndex.load()
+        return self._key_index
+
+    def generate_target_text(self, mode_file):
+        key_index = self.key_index if mode_file == WEAK_KEYS_MODE else None
+        return generate_target_text(mode_file, self.corpus_path, self.corpus_lines, key_index)
+
+    def save_key_index(self):
+        """Merge the key counts recorded since the last save into keystats.bin,
+        on the history writer's thread."""
+        if self._key_index is None:
+            return
+        pending = self._key_index.take_pending()
+        if pending is not None:
+            self.history_writer.submit(partial(self._key_index.merge_pending, pending), "key stats")
     
     def on_mount(self) -> None:
+        # Opens the history on its own thread, so startup never waits on disk
+        self.history_writer = HistoryWriter(on_error=self.report_error)
+        # Texts for upcoming tests are generated in the background
+        self.prefetcher = TextPrefetcher(self.generate_target_text)
         self.push_screen(MenuScreen())
+        # Everything else is loaded once the menu is on screen
+        self.call_after_refresh(self.start_warm_up)
+
+    def report_error(self, message):
+        # Called from background threads; notify() is thread-safe
+        self.notify(message, severity="error")
+
+    def start_warm_up(self):
+        threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
+
+    def warm_up(self):
+        """Load what the first test and the other screens need, off the UI thread."""
+        get_pack()
+        self.key_index
+        get_word_index()
+        # Importing NumPy (if installed) is the slowest part of opening Stats
+        from . import analytics  # noqa: F401
+
+    def on_unmount(self) -> None:
+        self.prefetcher.close()
+        self.save_key_index()
+        # Flush any results that are still queued for writing
+        self.history_writer.close()
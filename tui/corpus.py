@@ -0,0 +1,370 @@
+import os
+import random
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+from .pack import PACK_FILENAME, CorpusPack
+
+# --- Corpus cache ---
+# Tokenized asset files are kept in memory, keyed by resolved path, and reused
+# until the file's mtime or size changes. The cache is bounded both by number
+# of entries and by the total number of words/lines held.
+MAX_CACHE_ENTRIES = 32
+MAX_CACHE_TOKENS = 2_000_000
+
+_cache = OrderedDict()  # (path, kind) -> (mtime_ns, size, tokens)
+_cache_tokens = 0
+_resolved_paths = {}
+_lock = threading.Lock()
+
+
+def _resolve_asset_path(filename):
+    """Resolve the path to an asset file, checking multiple locations."""
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.path.join(base_path, "..", "assets", filename)
+    
+    if not os.path.exists(path):
+        path = os.path.join("assets", filename)
+        
+    return path if os.path.exists(path) else None
+
+
+def _stat_asset(filename):
+    """Return (path, stat) for an asset, reusing the previously resolved path."""
+    path = _resolved_paths.get(filename)
+    if path:
+        try:
+            return path, os.stat(path)
+        except OSError:
+            _resolved_paths.pop(filename, None)
+
+    path = _resolve_asset_path(filename)
+    if not path:
+        return None, None
+    path = os.path.abspath(path)
+    _resolved_paths[filename] = path
+    return path, os.stat(path)
+
+
+def _cache_get(key, st):
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    mtime_ns, size, tokens = entry
+    if mtime_ns != st.st_mtime_ns or size != st.st_size:
+        _cache_drop(key)
+        return None
+    _cache.move_to_end(key)
+    return tokens
+
+
+def _cache_drop(key):
+    global _cache_tokens
+    entry = _cache.pop(key, None)
+    if entry is not None:
+        _cache_tokens -= len(entry[2])
+
+
+def _cache_put(key, st, tokens):
+    global _cache_tokens
+    _cache_drop(key)
+    if len(tokens) > MAX_CACHE_TOKENS:
+        return
+    _cache[key] = (st.st_mtime_ns, st.st_size, tokens)
+    _cache_tokens += len(tokens)
+    # Evict least recently used corpora until back within bounds
+    while len(_cache) > MAX_CACHE_ENTRIES or _cache_tokens > MAX_CACHE_TOKENS:
+        _cache_drop(next(iter(_cache)))
+
+
+def clear_cache():
+    global _cache_tokens, _pack, _pack_checked
+    _pack, _pack_checked = None, False
+    with _lock:
+        _cache.clear()
+        _resolved_paths.clear()
+        _cache_tokens = 0
+
+
+def _load_cached(filename, kind, parse):
+    path, st = _stat_asset(filename)
+    if not path:
+        return None
+    key = (path, kind)
+    with _lock:
+        tokens = _cache_get(key, st)
+    if tokens is not None:
+        return tokens
+
+    with open(path, "r", encoding="utf-8") as f:
+        tokens = parse(f)
+    with _lock:
+        _cache_put(key, st, tokens)
+    return tokens
+
+
+def _parse_words(f):
+    return f.read().strip().replace("\n", " ").split()
+
+
+def _parse_lines(f):
+    return [line.strip() for line in f if line.strip()]
+
+
+def load_words_from_file(filename):
+    """Return the words of an asset file. The list is shared; do not modify it."""
+    try:
+        words = _load_cached(filename, "words", _parse_words)
+        if words is None:
+            return ["error", "loading", filename]
+        return words
+    except Exception as e:
+        return ["error", "loading", str(e)]
+
+
+def load_lines_from_file(filename):
+    """Return the non-empty lines of an asset file. The list is shared; do not modify it."""
+    try:
+        lines = _load_cached(filename, "lines", _parse_lines)
+        return lines if lines is not None else []
+    except Exception:
+        return []
+
+
+# --- Target text sampling ---
+# Uses the precompiled corpus pack (see tui/pack.py) when it exists and is
+# up to date for the asset, falling back to the cached word/line lists.
+_pack = None
+_pack_checked = False
+
+
+def get_pack():
+    """Open assets/corpus.pack once; returns None if missing or unreadable."""
+    global _pack, _pack_checked
+    if not _pack_checked:
+        _pack_checked = True
+        path = _resolve_asset_path(PACK_FILENAME)
+        if path:
+            try:
+                _pack = CorpusPack(path)
+                _pack.drop_stale(lambda filename: _stat_asset(filename)[1])
+            except (OSError, ValueError, struct.error):
+                _pack = None
+    return _pack
+
+
+def sample_words(filename, k, rng=random):
+    """Return up to k distinct random words from an asset."""
+    pack = get_pack()
+    if pack and pack.has(filename, "words"):
+        return pack.sample(filename, "words", k, rng)
+    words = load_words_from_file(filename)
+    return rng.sample(words, min(k, len(words)))
+
+
+def choice_line(filename, rng=random):
+    """Return a random non-empty line from an asset, or None."""
+    pack = get_pack()
+    if pack and pack.has(filename, "lines"):
+        return pack.choice(filename, "lines", rng)
+    lines = load_lines_from_file(filename)
+    return rng.choice(lines) if lines else None
+
+
+# --- Large custom corpora ---
+# Files passed with --corpus can be hundreds of MB, so they are never read
+# or tokenized as a whole. Words and lines are picked at random byte offsets
+# using small positioned reads; each pick is accepted with probability
+# 1/span (span = bytes whose offset maps to that word/line), which makes
+# every word or line equally likely. Memory use and start-up time do not
+# depend on file size.
+_WORD = re.compile(rb"\S+")
+_NON_SPACE = re.compile(rb"\S*")
+_SPACE = b" \t\r\n\f\v"
+# When a pick is not accepted within this many attempts, or this many picks
+# in a row land in whitespace with no word (or non-blank line) nearby, the
+# file is mostly empty: the text after a random offset is taken instead
+MAX_PICK_ATTEMPTS = 200
+MAX_EMPTY_PICKS = 32
+MAX_WORD_BYTES = 1024
+# Block size for scanning past long runs of whitespace
+SCAN_BYTES = 64 * 1024
+# Longer lines are cut to an excerpt of about this size around the pick
+MAX_LINE_BYTES = 4096
+
+_opened = {}
+
+
+class RandomAccessCorpus:
+    def __init__(self, path):
+        self.path = path
+        # Unbuffered: every read is exactly the window asked for
+        self._file = open(path, "rb", buffering=0)
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Seek + read pairs may come from the UI and the prefetch thread
+        self._read_lock = threading.Lock()
+        # Set once a scan finds nothing but whitespace, or once picks have
+        # had to fall back to scanning (so later ones go straight to it)
+        self._blank = not self.size
+        self._sparse = False
+
+    def close(self):
+        self._file.close()
+
+    def _read(self, start, end):
+        start = max(0, start)
+        end = min(self.size, end)
+        with self._read_lock:
+            self._file.seek(start)
+            return start, self._file.read(end - start)
+
+    def _pick_word(self, rng):
+        return self._word_at(rng.randrange(self.size))
+
+    def _word_at(self, offset):
+        """Return (word, span) for the word owning offset, or (None, 1) when
+        no word starts within MAX_WORD_BYTES after it."""
+        window = 64
+        while True:
+            base, data = self._read(offset - window, offset + window)
+            at_start = base == 0
+            at_end = base + len(data) == self.size
+            rel = offset - base
+            if data[rel] in _SPACE:
+                # Offsets in the gap before a word belong to that word
+                match = _WORD.search(data, rel)
+                if not match:
+                    if at_end or window >= MAX_WORD_BYTES:
+                        return None, 1
+                    window *= 2
+                    continue
+                start = match.start()
+            else:
+                start = rel
+                while start > 0 and data[start - 1] not in _SPACE:
+                    start -= 1
+            end = _WORD.match(data, start).end()
+            prev_end = start
+            while prev_end > 0 and data[prev_end - 1] in _SPACE:
+                prev_end -= 1
+
+            clipped = (prev_end == 0 and not at_start) or (end == len(data) and not at_end)
+            if clipped and window < MAX_WORD_BYTES:
+                window *= 2
+                continue
+            word = data[start:end]
+            if end == len(data) and not at_end:
+                # A word found far into a gap can run past the window
+                _, rest = self._read(base + end, base + start + MAX_WORD_BYTES)
+                word += _NON_SPACE.match(rest).group()
+            return word, len(word) + start - prev_end
+
+    def _pick_line(self, rng):
+        return self._line_at(rng.randrange(self.size))
+
+    def _line_at(self, offset):
+        window = 256
+        while True:
+            base, data = self._read(offset - window, offset + window)
+            rel = offset - base
+            start = data.rfind(b"\n", 0, rel) + 1
+            end = data.find(b"\n", rel)
+            complete_start = start > 0 or base == 0
+            complete_end = end != -1 or base + len(data) == self.size
+            if end == -1:
+                end = len(data)
+            if complete_start and complete_end:
+                return data[start:end].strip(), end + 1 - start
+            if window * 2 >= MAX_LINE_BYTES:
+                # Very long line: use the window, trimmed to whole words
+                if not complete_start:
+                    start = data.find(b" ", start) + 1 or end
+                if not complete_end:
+                    end = max(data.rfind(b" ", start, end), start)
+                return data[start:end].strip(), len(data)
+            window *= 2
+
+    def _find_text(self, offset):
+        """Return the position of the first non-whitespace byte at or after
+        offset, wrapping around at the end of the file, or None if there is none."""
+        pos = offset
+        wrapped = False
+        while True:
+            end = self.size if not wrapped else offset
+            if pos >= end:
+                if wrapped:
+                    return None
+                pos, wrapped = 0, True
+                continue
+            _, data = self._read(pos, min(pos + SCAN_BYTES, end))
+            skipped = len(data) - len(data.lstrip(_SPACE))
+            if skipped < len(data):
+                return pos + skipped
+            pos += len(data)
+
+    def _word_near(self, position, rng):
+        """Any whole word among those starting within MAX_WORD_BYTES of position."""
+        # The first word is read whole, as position may be inside it
+        words = [self._word_at(position)[0]]
+        base, data = self._read(position, position + MAX_WORD_BYTES)
+        more = _WORD.findall(data)[1:]
+        if more and base + len(data) < self.size and data[-1] not in _SPACE:
+            # The last one may continue past the read
+            more.pop()
+        return rng.choice(words + more)
+
+    def _line_near(self, position, rng):
+        return self._line_at(position)[0]
+
+    def _sample(self, pick, near, rng):
+        if self._blank:
+            return None
+        empty = 0
+        for _ in range(0 if self._sparse else MAX_PICK_ATTEMPTS):
+            token, span = pick(rng)
+            if not token:
+                empty += 1
+                if empty >= MAX_EMPTY_PICKS:
+                    break
+            elif rng.random() * span < 1:
+                return token.decode("utf-8", errors="replace")
+            else:
+                empty = 0
+        # Rejection sampling rarely lands on text here; scan for it instead
+        self._sparse = True
+        found = self._find_text(rng.randrange(self.size))
+        if found is None:
+            self._blank = True
+            return None
+        token = near(found, rng)
+        return token.decode("utf-8", errors="replace") if token else None
+
+    def sample_words(self, k, rng=random):
+        """Return k random words (with replacement)."""
+        words = []
+        for _ in range(k):
+            word = self._sample(self._pick_word, self._word_near, rng)
+            if word is None:
+                break
+            words.append(word)
+        return words
+
+    def choice_line(self, rng=random):
+        """Return one random non-empty line, or None."""
+        return self._sample(self._pick_line, self._line_near, rng)
+
+
+def open_corpus(path):
+    """Return a RandomAccessCorpus for path, reopening it if the file changed."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    entry = _opened.get(path)
+    if entry and entry[0] == (st.st_mtime_ns, st.st_size):
+        return entry[1]
+    if entry:
+        entry[1].close()
+    corpus = RandomAccessCorpus(path)
+    _opened[path] = ((st.st_mtime_ns, st.st_size), corpus)
+    return corpus
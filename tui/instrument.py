@@ -0,0 +1,97 @@
+import importlib
+import sys
+import time
+from array import array
+
+# Hot-path functions timed when instrumentation is enabled:
+# (module, attribute path, label). Wrappers are only installed by enable(),
+# so there is no overhead at all when instrumentation is off.
+TARGETS = [
+    ("tui.app", "TypingScreen.on_key", "on_key"),
+    ("tui.app", "TypingArea.render_content", "render_content"),
+    ("tui.app", "TypingScreen.update_timer", "timer_tick"),
+    ("tui.app", "TypingScreen.restart_test", "restart_test"),
+    ("tui.app", "sample_words", "sample_words"),
+    ("tui.app", "choice_line", "choice_line"),
+    ("tui.corpus", "load_words_from_file", "load_words"),
+    ("tui.corpus", "load_lines_from_file", "load_lines"),
+    ("tui.app", "HistoryScreen.load_page", "history_page"),
+    ("tui.logger", "Logger.__init__", "logger_open"),
+    ("tui.logger", "Logger.log_entries", "logger_write"),
+]
+
+_samples = {}  # label -> array of durations in seconds
+_installed = []
+
+
+def _wrap(owner, attr, label):
+    original = getattr(owner, attr)
+    samples = _samples.setdefault(label, array("d"))
+    clock = time.perf_counter
+
+    def timed(*args, **kwargs):
+        start = clock()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(clock() - start)
+
+    timed.__name__ = original.__name__
+    timed.__qualname__ = getattr(original, "__qualname__", original.__name__)
+    timed.__doc__ = original.__doc__
+    setattr(owner, attr, timed)
+    _installed.append((owner, attr, original))
+
+
+def enable():
+    """Install timing wrappers on every target."""
+    if _installed:
+        return
+    for module_name, path, label in TARGETS:
+        owner = importlib.import_module(module_name)
+        *parents, attr = path.split(".")
+        for name in parents:
+            owner = getattr(owner, name)
+        _wrap(owner, attr, label)
+
+
+def disable():
+    while _installed:
+        owner, attr, original = _installed.pop()
+        setattr(owner, attr, original)
+
+
+def is_enabled():
+    return bool(_installed)
+
+
+def _percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summary():
+    """Return a text table with count, p50/p95/p99 and max (ms) per target."""
+    lines = [f"{'target':<16} {'count':>7} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'max_ms':>9}"]
+    for _, _, label in TARGETS:
+        samples = _samples.get(label)
+        if not samples:
+            lines.append(f"{label:<16} {0:>7}")
+            continue
+        ordered = sorted(samples)
+        lines.append(
+            f"{label:<16} {len(ordered):>7} "
+            f"{_percentile(ordered, 50) * 1000:>9.3f} {_percentile(ordered, 95) * 1000:>9.3f} "
+            f"{_percentile(ordered, 99) * 1000:>9.3f} {ordered[-1] * 1000:>9.3f}"
+        )
+    return "\n".join(lines)
+
+
+def write_summary(path=None):
+    """Write the summary to a file, or to stderr when no path is given."""
+    text = summary() + "\n"
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    else:
+        sys.stderr.write(text)
@@ -0,0 +1,269 @@
+"""Per-key and per-bigram typing weakness index, and weak-key drills.
+
+`KeyIndex` keeps hit, error and latency counters for every printable ASCII
+key and every pair of consecutive keys in flat `array` buffers, updated in
+O(1) per keystroke and merged into a small binary file shared by every
+running instance. `weak_keys_text` turns it into a drill: bigrams are drawn
+from an alias table weighted by how badly they are typed, and each draw
+picks a word containing that bigram from a precomputed inverted index, so a
+drill costs O(1) per word.
+"""
+import os
+import random
+import struct
+import sys
+from array import array
+
+from .corpus import load_words_from_file
+from .storage import FileLock
+
+FIRST_KEY = 32   # " "
+KEY_COUNT = 95   # " " .. "~"
+BIGRAM_COUNT = KEY_COUNT * KEY_COUNT
+MAX_LATENCY_MS = 2000  # Longer gaps are pauses, not key latency
+
+# Smoothing towards a 5% error rate so rarely typed keys are not over-weighted
+PRIOR_ERRORS = 0.5
+PRIOR_HITS = 10
+
+WEAK_KEYS_SOURCES = ("easy.txt", "medium.txt", "hard.txt")
+
+
+def key_id(char):
+    """Slot of a character, or -1 if it is not tracked."""
+    code = ord(char) - FIRST_KEY
+    return code if 0 <= code < KEY_COUNT else -1
+
+
+def bigram_name(bigram):
+    first, second = divmod(bigram, KEY_COUNT)
+    return chr(first + FIRST_KEY) + chr(second + FIRST_KEY)
+
+
+class KeyIndex:
+    """Hit, error and latency totals per key and per bigram.
+
+    Counts recorded since the last save are also kept as pending deltas.
+    Saving adds them to whatever is on disk under a file lock, so several
+    instances sharing one file each contribute their own counts.
+    """
+
+    MAGIC = b"TTKI"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBH")  # magic, version, key count
+    COLUMNS = ("hits", "errors", "timed", "latency_ms")
+
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = self._empty(KEY_COUNT)
+        self.bigrams = self._empty(BIGRAM_COUNT)
+        self.pending_keys = self._empty(KEY_COUNT)
+        self.pending_bigrams = self._empty(BIGRAM_COUNT)
+
+    @classmethod
+    def _empty(cls, size):
+        return {name: array("Q", bytes(8 * size)) for name in cls.COLUMNS}
+
+    @classmethod
+    def load(cls, path="keystats.bin"):
+        """Read the index from path; a missing or damaged file gives an empty index."""
+        index = cls(path)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, key_count = cls.HEADER.unpack_from(data)
+            if magic != cls.MAGIC or version != cls.VERSION or key_count != KEY_COUNT:
+                return index
+            pos = cls.HEADER.size
+            for table, size in ((index.keys, KEY_COUNT), (index.bigrams, BIGRAM_COUNT)):
+                for name in cls.COLUMNS:
+                    column = array("Q")
+                    column.frombytes(data[pos:pos + 8 * size])
+                    if len(column) != size:
+                        raise ValueError("Truncated key index")
+                    pos += 8 * size
+                    if sys.byteorder == "big":
+                        column.byteswap()
+                    table[name] = column
+        except (OSError, struct.error, ValueError):
+            return cls(path)
+        return index
+
+    def save(self, path=None):
+        path = path or self.path
+        parts = [self.HEADER.pack(self.MAGIC, self.VERSION, KEY_COUNT)]
+        for table in (self.keys, self.bigrams):
+            for name in self.COLUMNS:
+                column = table[name]
+                if sys.byteorder == "big":
+                    column = array("Q", column)
+                    column.byteswap()
+                parts.append(column.tobytes())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, path)
+
+    def take_pending(self):
+        """Return the (keys, bigrams) deltas recorded since the last call and
+        start new ones, or None if nothing was recorded."""
+        if not any(self.pending_keys["hits"]):
+            return None
+        pending = (self.pending_keys, self.pending_bigrams)
+        self.pending_keys = self._empty(KEY_COUNT)
+        self.pending_bigrams = self._empty(BIGRAM_COUNT)
+        return pending
+
+    def merge_pending(self, pending, path=None):
+        """Add deltas from take_pending() to the index on disk.
+
+        The read-add-write runs under a lock on `<path>.lock`, so concurrent
+        instances never overwrite each other's counts. Slow enough (a few
+        hundred KB) that callers run it off the UI thread.
+        """
+        path = path or self.path
+        with FileLock(path + ".lock"):
+            on_disk = self.load(path)
+            for table, deltas in zip((on_disk.keys, on_disk.bigrams), pending):
+                for name in self.COLUMNS:
+                    column = table[name]
+                    for i, delta in enumerate(deltas[name]):
+                        if delta:
+                            column[i] += delta
+            on_disk.save(path)
+
+    def record(self, target_char, previous_char, correct, latency_ms=None):
+        """Count one keystroke aimed at target_char, typed after previous_char."""
+        key = key_id(target_char)
+        if key < 0:
+            return
+        slots = [(self.keys, key), (self.pending_keys, key)]
+        previous = key_id(previous_char) if previous_char else -1
+        if previous >= 0:
+            bigram = previous * KEY_COUNT + key
+            slots += ((self.bigrams, bigram), (self.pending_bigrams, bigram))
+        timed = latency_ms is not None and 0 < latency_ms <= MAX_LATENCY_MS
+        for table, slot in slots:
+            table["hits"][slot] += 1
+            if not correct:
+                table["errors"][slot] += 1
+            if timed:
+                table["timed"][slot] += 1
+                table["latency_ms"][slot] += latency_ms
+
+    def _scores(self, table, slots):
+        """Weakness score per slot: smoothed error rate times relative slowness."""
+        hits, errors = table["hits"], table["errors"]
+        timed, latency = table["timed"], table["latency_ms"]
+        total_timed = sum(timed)
+        mean_latency = sum(latency) / total_timed if total_timed else 0
+        scores = []
+        for i in slots:
+            score = (errors[i] + PRIOR_ERRORS) / (hits[i] + PRIOR_HITS)
+            if mean_latency and timed[i]:
+                score *= (latency[i] / timed[i]) / mean_latency
+            scores.append(score)
+        return scores
+
+    def key_scores(self, keys=range(KEY_COUNT)):
+        return self._scores(self.keys, keys)
+
+    def bigram_scores(self, bigrams=range(BIGRAM_COUNT)):
+        return self._scores(self.bigrams, bigrams)
+
+    def is_empty(self):
+        return not any(self.keys["hits"])
+
+    def weakest_keys(self, n=5):
+        """The n typed keys with the highest weakness score, weakest first."""
+        hits = self.keys["hits"]
+        scores = self.key_scores()
+        ranked = sorted((i for i in range(KEY_COUNT) if hits[i]), key=scores.__getitem__, reverse=True)
+        return [chr(i + FIRST_KEY) for i in ranked[:n]]
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        if not n or total <= 0:
+            raise ValueError("AliasTable needs a positive total weight")
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class BigramWordIndex:
+    """Inverted index from bigram slot to the words containing it."""
+
+    def __init__(self, words):
+        self.words = words
+        postings = {}
+        for word_id, word in enumerate(words):
+            seen = set()
+            for a, b in zip(word, word[1:]):
+                first, second = key_id(a), key_id(b)
+                if first < 0 or second < 0:
+                    continue
+                bigram = first * KEY_COUNT + second
+                if bigram not in seen:
+                    seen.add(bigram)
+                    postings.setdefault(bigram, array("I")).append(word_id)
+        self.postings = postings
+
+
+_word_index = None  # (source word lists, BigramWordIndex)
+
+
+def get_word_index(sources=WEAK_KEYS_SOURCES):
+    """Inverted index over the drill word lists, rebuilt only when they change."""
+    global _word_index
+    lists = tuple(load_words_from_file(name) for name in sources)
+    if _word_index is None or len(_word_index[0]) != len(lists) or any(
+        a is not b for a, b in zip(_word_index[0], lists)
+    ):
+        # Word lists are cached by the corpus module; a new list object means the file changed
+        words = list(dict.fromkeys(word for words in lists for word in words))
+        _word_index = (lists, BigramWordIndex(words))
+    return _word_index[1]
+
+
+def weak_keys_text(key_index, k=100, rng=random, top=30):
+    """Build a drill of k words concentrated on the index's weakest bigrams."""
+    word_index = get_word_index()
+    if not word_index.postings:
+        return None
+    candidates = list(word_index.postings)
+    if key_index is None or key_index.is_empty():
+        # Nothing recorded yet: every bigram is equally likely
+        weights = [1.0] * len(candidates)
+    else:
+        # Drill only the weakest bigrams, in proportion to their scores;
+        # shuffling first breaks ties randomly
+        rng.shuffle(candidates)
+        ranked = sorted(zip(key_index.bigram_scores(candidates), candidates), key=lambda p: p[0], reverse=True)
+        weights = [score for score, _ in ranked[:top]]
+        candidates = [bigram for _, bigram in ranked[:top]]
+    table = AliasTable(weights)
+
+    words = []
+    for _ in range(k):
+        postings = word_index.postings[candidates[table.sample(rng)]]
+        words.append(word_index.words[postings[rng.randrange(len(postings))]])
+    return " ".join(words)
@@ -1,39 +1,274 @@
-import json
+import atexit
 import os
+import queue
+import sys
+import threading
 import time
 from datetime import datetime
+from functools import partial
+from .storage import JsonlStore, SqliteStore
+from .summary import HistorySummary
+
+# "jsonl" (default) or "sqlite"; can be overridden per Logger
+BACKEND_ENV_VAR = "TYPER_TUI_HISTORY_BACKEND"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# Per-(mode, duration) aggregates live next to the log, e.g. history.jsonl.summary.json
+SUMMARY_SUFFIX = ".summary.json"
+
+def build_entry(mode, duration, wpm, accuracy, raw_wpm, recording=None, timeline=None):
+    """Return the history record for one result, stamped with the current time."""
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "mode": mode,
+        "duration": duration,
+        "wpm": round(wpm, 2),
+        "accuracy": round(accuracy, 2),
+        "raw_wpm": round(raw_wpm, 2)
+    }
+    if recording is not None and len(recording):
+        # Compressed, base64-encoded KeystrokeRecording
+        entry["keystrokes"] = recording.encode()
+    if timeline is not None and len(timeline):
+        # Compressed, base64-encoded per-second Timeline
+        entry["timeline"] = timeline.encode()
+    return entry
+
+
+def print_error(message):
+    print(message, file=sys.stderr)
+
 
 class Logger:
-    def __init__(self, log_file="history.json"):
+    """Records test results and answers queries over past results.
+
+    Results go to an append-only JSON-lines file by default, or to an indexed
+    SQLite database when the "sqlite" backend is selected (via the `backend`
+    argument, a `.db` log file, or the TYPER_TUI_HISTORY_BACKEND variable).
+    """
+
+    def __init__(self, log_file=None, legacy_file="history.json", backend=None):
         # Ensure log file is in a valid location (e.g., user home or app dir)
         # For this CLI, we'll keep it local or in a consistent app dir
-        self.log_file = log_file
-        self.ensure_file()
-
-    def ensure_file(self):
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, "w") as f:
-                json.dump([], f)
-
-    def log_result(self, mode, duration, wpm, accuracy, raw_wpm):
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "mode": mode,
-            "duration": duration,
-            "wpm": round(wpm, 2),
-            "accuracy": round(accuracy, 2),
-            "raw_wpm": round(raw_wpm, 2)
-        }
-        
-        history = self.get_history()
-        history.append(entry)
-        
-        with open(self.log_file, "w") as f:
-            json.dump(history, f, indent=4)
+        if backend is None:
+            if log_file and log_file.endswith(SQLITE_EXTENSIONS):
+                backend = "sqlite"
+            else:
+                backend = os.environ.get(BACKEND_ENV_VAR, "jsonl").lower()
+
+        if backend == "sqlite":
+            self.log_file = log_file or "history.db"
+            self.store = SqliteStore(self.log_file, import_files=("history.jsonl", legacy_file))
+        elif backend == "jsonl":
+            self.log_file = log_file or "history.jsonl"
+            self.store = JsonlStore(self.log_file, legacy_file=legacy_file)
+        else:
+            raise ValueError(f"Unknown history backend: {backend}")
+        self.backend = backend
+        self.summary = HistorySummary(self.log_file + SUMMARY_SUFFIX)
+
+    # Entries need no open store, so building one is shared with HistoryWriter
+    build_entry = staticmethod(build_entry)
+
+    def log_result(self, mode, duration, wpm, accuracy, raw_wpm, recording=None, timeline=None):
+        self.log_entries([self.build_entry(mode, duration, wpm, accuracy, raw_wpm, recording, timeline)])
+
+    def log_entries(self, entries):
+        # Held across the append and the summary update so writers in other
+        # processes cannot slip an entry in between
+        with self.store.lock:
+            summary = self._fresh_summary()
+            self.store.append_many(entries)
+            for entry in entries:
+                summary.add(entry)
+            summary.fingerprint = self.store.fingerprint()
+            try:
+                summary.save()
+            except OSError:
+                # The result itself is saved; a missing summary is rebuilt on next use
+                pass
+
+    def _fresh_summary(self):
+        """Return the summary, reloading or rebuilding it if the history changed."""
+        summary = self.summary
+        fingerprint = self.store.fingerprint()
+        if summary.fingerprint == fingerprint:
+            return summary
+        if summary.load() and summary.fingerprint == fingerprint:
+            return summary
+        with self.store.lock:
+            fingerprint = self.store.fingerprint()
+            summary.rebuild(self.store.iter_entries(), fingerprint)
+            try:
+                summary.save()
+            except OSError:
+                pass
+        return summary
+
+    def warm(self):
+        """Bring the summary up to date now rather than on first query or write."""
+        self._fresh_summary()
+
+    def get_summary(self, mode, duration):
+        """Return the ModeSummary for (mode, duration), or None if never played."""
+        return self._fresh_summary().get(mode, duration)
+
+    def get_summaries(self):
+        """Return {(mode, duration): ModeSummary} for everything played."""
+        return dict(self._fresh_summary().modes)
 
     def get_history(self):
+        """Yield logged results, oldest first."""
+        return self.store.iter_entries()
+
+    def get_result_rows(self):
+        """Yield (timestamp, mode, duration, wpm, accuracy, raw_wpm) tuples, oldest first."""
+        return self.store.iter_rows()
+
+    def iter_history_newest_first(self):
+        """Yield logged results, newest first, loading them lazily."""
+        return self.store.iter_newest_first()
+
+    def get_last(self, n):
+        """Return the n most recent results, newest first."""
+        return self.store.last(n)
+
+    def get_by_mode(self, mode, duration=None, limit=None):
+        """Return results for a mode (and optionally duration), newest first."""
+        return self.store.by_mode(mode, duration, limit)
+
+    def get_date_range(self, start=None, end=None):
+        """Return results with start <= timestamp < end, newest first."""
+        return self.store.date_range(start, end)
+
+    def get_best_wpm_per_mode(self):
+        """Return {mode: entry} holding the highest-WPM result per mode."""
+        return self.store.best_wpm_per_mode()
+
+    def close(self):
+        self.store.close()
+
+
+class HistoryWriter:
+    """Persists results on a background thread so the UI never waits on disk.
+
+    Entries are stamped when submitted and queued; the writer thread appends
+    whatever has accumulated in a single batch. Other saves can be queued on
+    the same thread with `submit`. `flush` blocks until the queue
+    is empty and `close` (also run at interpreter exit) drains it and stops
+    the thread. Without an explicit logger, the default `Logger` is opened
+    (and its summary warmed) on the writer thread. Failures to open or write
+    are passed to `on_error` (stderr by default) instead of being raised.
+    """
+
+    _STOP = object()
+
+    def __init__(self, logger=None, batch_size=64, on_error=None):
+        self._logger = logger
+        self.on_error = on_error or print_error
+        self._open_error = None
+        self._opened = threading.Event()
+        if logger is not None:
+            self._opened.set()
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def logger(self):
+        """The Logger results are written to; waits until it has been opened."""
+        self._opened.wait()
+        if self._open_error is not None:
+            raise self._open_error
+        return self._logger
+
+    def _open(self):
+        try:
+            self._logger = Logger()
+        except Exception as e:
+            self._open_error = e
+            self.on_error(f"Failed to open history: {e}")
+            return
+        finally:
+            self._opened.set()
         try:
-            with open(self.log_file, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
+            self._logger.warm()
+        except Exception as e:
+            self.on_error(f"Failed to update history summary: {e}")
+
+    def log_result(self, mode, duration, wpm, accuracy, raw_wpm, recording=None, timeline=None):
+        # Encoded now, before the caller can reuse the recording for the next
+        # test; only queued, so the caller never waits for the history to open
+        entry = build_entry(mode, duration, wpm, accuracy, raw_wpm, recording, timeline)
+        if self._closed:
+            # Late submissions after shutdown are written synchronously
+            self._write([entry])
+        else:
+            self._queue.put(entry)
+
+    def submit(self, task, what="data"):
+        """Run task() on the writer thread, e.g. to save other state off the UI thread."""
+        item = partial(self._run_task, task, what)
+        if self._closed:
+            item()
+        else:
+            self._queue.put(item)
+
+    def _run_task(self, task, what):
+        try:
+            task()
+        except Exception as e:
+            self.on_error(f"Failed to save {what}: {e}")
+
+    def _write(self, batch):
+        try:
+            self.logger.log_entries(batch)
+        except Exception as e:
+            self.on_error(f"Failed to save {len(batch)} result(s): {e}")
+
+    def _run(self):
+        if not self._opened.is_set():
+            self._open()
+        while True:
+            item = self._queue.get()
+            batch, tasks = [], []
+            stop = False
+            while True:
+                if item is self._STOP:
+                    stop = True
+                elif callable(item):
+                    tasks.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            try:
+                if batch:
+                    self._write(batch)
+                for task in tasks:
+                    task()
+            finally:
+                for _ in range(len(batch) + len(tasks) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every submitted result has been written."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
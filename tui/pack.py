@@ -0,0 +1,146 @@
+"""Precompiled corpus pack.
+
+All asset files are compiled into one file holding, for each asset, its
+pre-tokenized words and lines plus an offset index, so a random word or line
+is fetched by index with no text parsing. Build it with:
+
+    python -m tui.pack            # writes assets/corpus.pack
+
+Layout (little-endian):
+    header   magic "TTPK", version u16, section count u16
+    table    one entry per (asset, kind): name length u16, kind u8,
+             token count u32, index offset u64, data offset u64,
+             source mtime_ns u64, source size u64, followed by the name
+    index    count + 1 u32 byte offsets into the section's data
+    data     UTF-8 tokens, back to back
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+
+MAGIC = b"TTPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+ENTRY = struct.Struct("<HBIQQQQ")
+KINDS = ("words", "lines")
+PACK_FILENAME = "corpus.pack"
+
+
+def _tokenize(text, kind):
+    if kind == "words":
+        return text.replace("\n", " ").split()
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def build_pack(assets_dir, out_path):
+    """Compile every .txt file in assets_dir into a pack at out_path."""
+    sections = []
+    for filename in sorted(os.listdir(assets_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        path = os.path.join(assets_dir, filename)
+        st = os.stat(path)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        for kind_id, kind in enumerate(KINDS):
+            tokens = [t.encode("utf-8") for t in _tokenize(text, kind)]
+            index = array("I", [0])
+            for token in tokens:
+                index.append(index[-1] + len(token))
+            if sys.byteorder == "big":
+                index.byteswap()
+            sections.append((filename.encode("utf-8"), kind_id, len(tokens), index.tobytes(),
+                             b"".join(tokens), st.st_mtime_ns, st.st_size))
+
+    table_size = HEADER.size + sum(ENTRY.size + len(s[0]) for s in sections)
+    offset = table_size
+    table = [HEADER.pack(MAGIC, VERSION, len(sections))]
+    blobs = []
+    for name, kind_id, count, index, data, mtime_ns, size in sections:
+        table.append(ENTRY.pack(len(name), kind_id, count, offset, offset + len(index), mtime_ns, size))
+        table.append(name)
+        blobs.append(index)
+        blobs.append(data)
+        offset += len(index) + len(data)
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(table))
+        f.write(b"".join(blobs))
+    os.replace(tmp_path, out_path)
+    return len(sections) // len(KINDS)
+
+
+class CorpusPack:
+    """Memory-mapped view of a corpus pack."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a corpus pack")
+        if sys.byteorder == "big":
+            # Index arrays are read in place as native unsigned ints
+            raise ValueError("Corpus packs are only read on little-endian hosts")
+
+        # (filename, kind) -> (token count, index view, data offset, source mtime_ns, source size)
+        self.sections = {}
+        view = memoryview(self._mm)
+        pos = HEADER.size
+        for _ in range(count):
+            name_len, kind_id, tokens, index_offset, data_offset, mtime_ns, size = ENTRY.unpack_from(self._mm, pos)
+            pos += ENTRY.size
+            name = self._mm[pos:pos + name_len].decode("utf-8")
+            pos += name_len
+            index = view[index_offset:data_offset].cast("I")
+            self.sections[(name, KINDS[kind_id])] = (tokens, index, data_offset, mtime_ns, size)
+
+    def drop_stale(self, stat_source):
+        """Forget sections whose source file changed since the pack was built.
+
+        stat_source(filename) returns an os.stat_result or None.
+        """
+        for key, (_, _, _, mtime_ns, size) in list(self.sections.items()):
+            st = stat_source(key[0])
+            if st is None or st.st_mtime_ns != mtime_ns or st.st_size != size:
+                del self.sections[key]
+
+    def has(self, filename, kind):
+        return (filename, kind) in self.sections
+
+    def count(self, filename, kind):
+        return self.sections[(filename, kind)][0]
+
+    def get(self, filename, kind, i):
+        _, index, data_offset, _, _ = self.sections[(filename, kind)]
+        return self._mm[data_offset + index[i]:data_offset + index[i + 1]].decode("utf-8")
+
+    def sample(self, filename, kind, k, rng=random):
+        """Return up to k distinct random tokens."""
+        count = self.count(filename, kind)
+        return [self.get(filename, kind, i) for i in rng.sample(range(count), min(k, count))]
+
+    def choice(self, filename, kind, rng=random):
+        count = self.count(filename, kind)
+        return self.get(filename, kind, rng.randrange(count)) if count else None
+
+
+def main():
+    default_assets = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+    parser = argparse.ArgumentParser(description="Compile asset files into a corpus pack.")
+    parser.add_argument("--assets", default=default_assets, help="Directory of .txt assets")
+    parser.add_argument("--out", help=f"Output file (default: <assets>/{PACK_FILENAME})")
+    args = parser.parse_args()
+    out_path = args.out or os.path.join(args.assets, PACK_FILENAME)
+    modes = build_pack(args.assets, out_path)
+    print(f"Packed {modes} assets into {out_path} ({os.path.getsize(out_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
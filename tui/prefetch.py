@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class TextPrefetcher:
+    """Keeps the next few target texts for the selected mode ready.
+
+    A background thread calls `generate(mode_file)` until the active mode's
+    queue holds `depth` texts, so Start/Restart only has to pop a string.
+    Queues for previously selected modes are kept (most recent first) while
+    the total number of queued characters stays under `max_chars`.
+    """
+
+    def __init__(self, generate, depth=3, max_chars=256 * 1024):
+        self.generate = generate
+        self.depth = depth
+        self.max_chars = max_chars
+        self._queues = OrderedDict()  # mode_file -> deque of texts
+        self._chars = 0
+        self._active = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="text-prefetch", daemon=True)
+        self._thread.start()
+
+    def set_mode(self, mode_file):
+        """Make mode_file the mode to keep filled."""
+        with self._cond:
+            self._active = mode_file
+            self._queues.setdefault(mode_file, deque())
+            self._queues.move_to_end(mode_file)
+            self._evict()
+            self._cond.notify()
+
+    def pop(self, mode_file):
+        """Return a ready text for mode_file, or None if none is queued."""
+        with self._cond:
+            queue = self._queues.get(mode_file)
+            text = queue.popleft() if queue else None
+            if text is not None:
+                self._chars -= len(text)
+            if mode_file == self._active:
+                self._cond.notify()
+            return text
+
+    def clear(self):
+        with self._cond:
+            self._queues.clear()
+            self._chars = 0
+            if self._active is not None:
+                self._queues[self._active] = deque()
+            self._cond.notify()
+
+    def _evict(self):
+        # Drop the least recently selected modes' texts first
+        for mode_file in list(self._queues):
+            if self._chars <= self.max_chars:
+                break
+            if mode_file == self._active:
+                continue
+            queue = self._queues.pop(mode_file)
+            self._chars -= sum(len(text) for text in queue)
+
+    def _needs_text(self):
+        queue = self._queues.get(self._active)
+        return queue is not None and len(queue) < self.depth and self._chars < self.max_chars
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._needs_text():
+                    self._cond.wait()
+                if self._closed:
+                    return
+                mode_file = self._active
+
+            try:
+                text = self.generate(mode_file)
+            except Exception:
+                text = None
+
+            with self._cond:
+                queue = self._queues.get(mode_file)
+                if not text or queue is None:
+                    # Mode was evicted meanwhile, or generation failed; don't spin on errors
+                    if not text:
+                        self._cond.wait(1.0)
+                    continue
+                queue.append(text)
+                self._chars += len(text)
+                self._evict()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,186 @@
+import base64
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+from .stats import TypingStats
+
+
+class KeystrokeRecording:
+    """Compact, timestamped record of every edit made during a test.
+
+    Events are stored column-wise in `array` buffers (milliseconds since the
+    test started, an event kind byte with a correctness flag, and the typed
+    code point), so recording a key allocates no per-event Python objects.
+    Together with the target text this is enough to replay a test exactly.
+    """
+
+    CHAR = 0
+    BACKSPACE = 1
+    DELETE_WORD = 2
+    CORRECT = 0x80  # Flag bits on CHAR events
+    PASTED = 0x40
+
+    MAGIC = b"TTKR"
+    VERSION = 1
+    # magic, version, event count, target text length in bytes
+    HEADER = struct.Struct("<4sBII")
+
+    __slots__ = ("target_text", "times", "kinds", "chars", "_start")
+
+    def __init__(self, target_text=""):
+        self.target_text = target_text
+        self.times = array("I")
+        self.kinds = array("B")
+        self.chars = array("I")
+        self._start = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def reset(self, target_text):
+        self.target_text = target_text
+        del self.times[:], self.kinds[:], self.chars[:]
+        self._start = None
+
+    def start(self):
+        # Once per reset, so recorded times never go backwards
+        if self._start is None:
+            self._start = time.perf_counter()
+
+    def _now_ms(self):
+        if self._start is None:
+            return 0
+        return int((time.perf_counter() - self._start) * 1000)
+
+    def record_char(self, char, correct, pasted=False):
+        self.times.append(self._now_ms())
+        self.kinds.append(self.CHAR | (self.CORRECT if correct else 0) | (self.PASTED if pasted else 0))
+        self.chars.append(ord(char))
+
+    def record_backspace(self):
+        self.times.append(self._now_ms())
+        self.kinds.append(self.BACKSPACE)
+        self.chars.append(0)
+
+    def record_delete_word(self):
+        self.times.append(self._now_ms())
+        self.kinds.append(self.DELETE_WORD)
+        self.chars.append(0)
+
+    # --- Serialization ---
+
+    def to_bytes(self):
+        target = self.target_text.encode("utf-8")
+        # Store time deltas; they are small and compress far better
+        deltas = array("I", self.times)
+        for i in range(len(deltas) - 1, 0, -1):
+            deltas[i] -= deltas[i - 1]
+        chars = array("I", self.chars)
+        if sys.byteorder == "big":
+            deltas.byteswap()
+            chars.byteswap()
+        payload = b"".join((
+            self.HEADER.pack(self.MAGIC, self.VERSION, len(self.kinds), len(target)),
+            target,
+            deltas.tobytes(),
+            self.kinds.tobytes(),
+            chars.tobytes(),
+        ))
+        return zlib.compress(payload, 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = zlib.decompress(data)
+        magic, version, count, target_len = cls.HEADER.unpack_from(payload)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a keystroke recording")
+        offset = cls.HEADER.size
+        recording = cls(payload[offset:offset + target_len].decode("utf-8"))
+        offset += target_len
+
+        times = array("I")
+        times.frombytes(payload[offset:offset + count * 4])
+        offset += count * 4
+        recording.kinds.frombytes(payload[offset:offset + count])
+        offset += count
+        recording.chars.frombytes(payload[offset:offset + count * 4])
+        if sys.byteorder == "big":
+            times.byteswap()
+            recording.chars.byteswap()
+        total = 0
+        for delta in times:
+            total += delta
+            recording.times.append(total)
+        return recording
+
+    def encode(self):
+        """Return the recording as a base64 string for storing in a history entry."""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, text):
+        return cls.from_bytes(base64.b64decode(text))
+
+    # --- Replay ---
+
+    def events(self):
+        """Yield (ms, kind, char, correct) for every recorded event."""
+        for t, kind, code in zip(self.times, self.kinds, self.chars):
+            base = kind & ~(self.CORRECT | self.PASTED)
+            yield t, base, chr(code) if base == self.CHAR else "", bool(kind & self.CORRECT)
+
+    def replay(self):
+        """Re-apply the events to the target text.
+
+        Yields (ms, user_input) after each event; the final state matches the
+        one the test ended with.
+        """
+        user_input = ""
+        for t, kind, char, _ in self.events():
+            if kind == self.CHAR:
+                if len(user_input) < len(self.target_text):
+                    user_input += char
+            elif kind == self.BACKSPACE:
+                user_input = user_input[:-1]
+            elif kind == self.DELETE_WORD:
+                if user_input.endswith(" "):
+                    user_input = user_input[:-1]
+                else:
+                    user_input = user_input[:user_input.rfind(" ") + 1]
+            yield t, user_input
+
+    def replay_stats(self):
+        """Rebuild the TypingStats of the recorded test."""
+        stats = TypingStats()
+        user_input = ""
+        pasted = bytearray()  # Flag per input character
+        for kind, (_, new_input) in zip(self.kinds, self.replay()):
+            if len(new_input) > len(user_input):
+                i = len(user_input)
+                flag = bool(kind & self.PASTED)
+                stats.add(new_input[i], self.target_text[i], flag)
+                pasted.append(flag)
+            else:
+                length = len(new_input)
+                stats.remove(user_input[length:], self.target_text[length:len(user_input)], pasted[length:])
+                del pasted[length:]
+            user_input = new_input
+        return stats
+
+    def to_key_stream(self):
+        """Return [(delay_seconds, key)] suitable for Pilot.press replays."""
+        stream = []
+        last = 0
+        for t, kind, char, _ in self.events():
+            if kind == self.CHAR:
+                key = "space" if char == " " else char
+            elif kind == self.BACKSPACE:
+                key = "backspace"
+            else:
+                key = "ctrl+w"
+            stream.append(((t - last) / 1000, key))
+            last = t
+        return stream
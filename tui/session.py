@@ -0,0 +1,296 @@
+"""UI-independent typing test engine.
+
+`TypingSession` holds the whole state of one test (target text, input,
+running stats, keystroke recording, per-second timeline, timing) and
+applies edits to it. It does not depend on Textual: `TypingScreen` is one
+view over a session, and any asyncio program can drive many sessions at
+once by calling the input methods and consuming `events()`.
+"""
+import asyncio
+import time
+
+from .recording import KeystrokeRecording
+from .stats import TypingStats
+from .timeline import Timeline
+
+# Events passed to listeners and yielded by TypingSession.events()
+RESET = "reset"        # New target text, nothing typed yet
+STARTED = "started"    # First key typed; the clock is running
+INPUT = "input"        # Input or target text changed
+FINISHED = "finished"  # Time is up or the text is done; see session.result
+CANCELLED = "cancelled"  # Abandoned before finishing; there is no result
+
+# Shortest test with a result: over less time a few keys give an absurd WPM
+MIN_ELAPSED = 1.0
+
+
+def calculate_stats(start_time, total_chars, correct_chars, now=None):
+    """Return (wpm, accuracy, raw_wpm) for a test started at start_time."""
+    if start_time == 0:
+        return 0, 0, 0
+
+    elapsed = (now if now is not None else time.monotonic()) - start_time
+    minutes = max(elapsed, MIN_ELAPSED) / 60
+    raw_wpm = (total_chars / 5) / minutes
+    wpm = (correct_chars / 5) / minutes
+    accuracy = (correct_chars / total_chars * 100) if total_chars > 0 else 100
+
+    return wpm, accuracy, raw_wpm
+
+
+class TypingSession:
+    """One typing test: input editing, timing, stats and completion.
+
+    `text_source` is called with no arguments for each new target text (and,
+    in endless mode, for every chunk appended to it). Listeners are called
+    synchronously with each event; `events()` is the async equivalent.
+    When started inside a running event loop the session ends itself at the
+    deadline; without one, the caller calls `finish()` when time is up.
+    """
+
+    # Endless mode: keep at least this many untyped characters ahead of the cursor
+    ENDLESS_LOOKAHEAD = 200
+
+    __slots__ = (
+        "text_source", "duration", "endless", "key_index",
+        "target_text", "user_input", "stats", "recording", "timeline",
+        "start_time", "deadline", "running", "finished", "result",
+        "_pasted", "_listeners", "_timer",
+    )
+
+    def __init__(self, text_source, duration=30, endless=False, key_index=None):
+        self.text_source = text_source
+        self.duration = duration
+        self.endless = endless
+        # Optional KeyIndex updated with every typed character
+        self.key_index = key_index
+
+        self.target_text = ""
+        self.user_input = ""
+        self.stats = TypingStats()
+        self.recording = KeystrokeRecording()
+        self.timeline = Timeline()
+        self.start_time = 0
+        self.deadline = 0
+        self.running = False
+        self.finished = False
+        # (wpm, accuracy, raw_wpm) once finished, unless it ended within
+        # MIN_ELAPSED of starting
+        self.result = None
+        # Flag per input character once anything has been pasted
+        self._pasted = None
+        self._listeners = ()
+        self._timer = None
+
+    # --- Events ---
+
+    def add_listener(self, listener):
+        self._listeners += (listener,)
+
+    def remove_listener(self, listener):
+        listeners = list(self._listeners)
+        listeners.remove(listener)
+        self._listeners = tuple(listeners)
+
+    def _emit(self, event):
+        for listener in self._listeners:
+            listener(event)
+
+    async def events(self):
+        """Yield every event from now on, for as long as the caller iterates."""
+        queue = asyncio.Queue()
+        self.add_listener(queue.put_nowait)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.remove_listener(queue.put_nowait)
+
+    async def wait_finished(self):
+        """Wait for the test to end and return (wpm, accuracy, raw_wpm),
+        or None if it was cancelled or too short to count."""
+        if not self.finished:
+            async for event in self.events():
+                if event in (FINISHED, CANCELLED):
+                    break
+        return self.result
+
+    # --- Lifecycle ---
+
+    def reset(self, target_text=None):
+        """Start over with target_text, or the next text from text_source."""
+        self._cancel_timer()
+        # Fixed text is used e.g. when replaying a recording
+        self.target_text = target_text if target_text is not None else self.text_source()
+        self.user_input = ""
+        self.stats.reset()
+        self.recording.reset(self.target_text)
+        self.timeline.reset()
+        self.start_time = 0
+        self.deadline = 0
+        self.running = False
+        self.finished = False
+        self.result = None
+        self._pasted = None
+        self._emit(RESET)
+
+    def start(self):
+        # Once per reset: the clock never restarts over kept input
+        if self.start_time or self.finished:
+            return
+        self.running = True
+        self.start_time = time.monotonic()
+        self.deadline = self.start_time + self.duration
+        self.recording.start()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._timer = loop.call_later(self.duration, self.finish)
+        self._emit(STARTED)
+
+    def finish(self):
+        if self.finished:
+            return
+        self._cancel_timer()
+        now = time.monotonic()
+        if self.running:
+            self._close_seconds(now, final=True)
+        if not self.running or now - self.start_time >= MIN_ELAPSED:
+            self.result = self.current_stats(now)
+        self.running = False
+        self.finished = True
+        self._emit(FINISHED)
+
+    def cancel(self):
+        """Abandon the test without a result; only reset() makes it usable again."""
+        if self.finished:
+            return
+        self._cancel_timer()
+        self.running = False
+        self.finished = True
+        self._emit(CANCELLED)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _close_seconds(self, now, final=False):
+        """Sample every whole second of the test that ended before now.
+
+        Called before each edit is applied: the totals cannot have changed
+        since the previous edit, so they are exactly the totals at the end of
+        each of those seconds. The final call also samples a partial last second.
+        """
+        timeline = self.timeline
+        stats = self.stats
+        elapsed = min(now - self.start_time, self.duration)
+        while timeline.count < int(elapsed):
+            timeline.sample(stats.correct, stats.keystrokes, stats.errors_made)
+        if final and elapsed - timeline.count > 0.05:
+            timeline.sample(stats.correct, stats.keystrokes, stats.errors_made, elapsed)
+
+    def current_stats(self, now=None):
+        return calculate_stats(self.start_time, self.stats.total, self.stats.correct, now)
+
+    def remaining(self, now=None):
+        return max(0, self.deadline - (now if now is not None else time.monotonic()))
+
+    def is_accepting_input(self):
+        return not self.finished and len(self.user_input) < len(self.target_text)
+
+    # --- Input ---
+
+    def type_char(self, char):
+        """Type one character; the first printable one starts the clock."""
+        if self.finished:
+            return
+        if self.running:
+            self._close_seconds(time.monotonic())
+        elif char.isprintable():
+            self.start()
+        self._apply_char(char)
+        self._after_input()
+
+    def type_text(self, text):
+        """Type a pasted string as one batch, with a single INPUT event.
+
+        A paste never starts the clock, so it can't be the whole test; it is
+        ignored until the first key has been typed. Pasted characters fill the
+        input but count toward no statistic and are not added to the key index.
+        """
+        text = " ".join(text.split())
+        if not text or not self.running or not self.is_accepting_input():
+            return
+        self._close_seconds(time.monotonic())
+        if self._pasted is None:
+            self._pasted = bytearray(len(self.user_input))
+        for char in text:
+            self._apply_char(char, pasted=True)
+            if len(self.user_input) >= len(self.target_text):
+                break
+        self._after_input()
+
+    def backspace(self):
+        if self.finished:
+            return
+        if self.running:
+            self._close_seconds(time.monotonic())
+        if self.user_input:
+            self.recording.record_backspace()
+            self._truncate(len(self.user_input) - 1)
+        self._after_input()
+
+    def delete_word(self):
+        """Delete back to the start of the current (or just finished) word."""
+        if self.finished or not self.user_input:
+            return
+        if self.running:
+            self._close_seconds(time.monotonic())
+        self.recording.record_delete_word()
+        if self.user_input.endswith(" "):
+            self._truncate(len(self.user_input) - 1)
+        else:
+            self._truncate(self.user_input.rfind(" ") + 1)
+        self._after_input()
+
+    def _apply_char(self, char, pasted=False):
+        position = len(self.user_input)
+        if position >= len(self.target_text):
+            return
+        target_char = self.target_text[position]
+        correct = self.stats.add(char, target_char, pasted)
+        self.recording.record_char(char, correct, pasted)
+        if self._pasted is not None:
+            self._pasted.append(pasted)
+        if self.key_index is not None and not pasted:
+            times = self.recording.times
+            self.key_index.record(
+                target_char,
+                self.target_text[position - 1] if position else None,
+                correct,
+                times[-1] - times[-2] if len(times) > 1 else None,
+            )
+        self.user_input += char
+        if self.endless and len(self.target_text) - len(self.user_input) < self.ENDLESS_LOOKAHEAD:
+            self.target_text += " " + self.text_source()
+            self.recording.target_text = self.target_text
+
+    def _truncate(self, length):
+        """Cut user_input down to length, keeping the running stats in sync."""
+        pasted = self._pasted
+        self.stats.remove(
+            self.user_input[length:],
+            self.target_text[length:len(self.user_input)],
+            pasted[length:] if pasted is not None else None,
+        )
+        if pasted is not None:
+            del pasted[length:]
+        self.user_input = self.user_input[:length]
+
+    def _after_input(self):
+        self._emit(INPUT)
+        if len(self.user_input) >= len(self.target_text):
+            self.finish()
@@ -0,0 +1,63 @@
+class TypingStats:
+    """Running character counts for the current test.
+
+    Updated by TypingSession as characters are typed or removed so that WPM and
+    accuracy can be read in constant time instead of re-comparing the whole
+    input against the target text.
+    """
+
+    __slots__ = ("correct", "incorrect", "pasted", "keystrokes", "errors_made")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # State of the current input
+        self.correct = 0
+        self.incorrect = 0
+        # Pasted characters fill the input but count toward no statistic
+        self.pasted = 0
+        # Every character ever typed, including ones later removed
+        self.keystrokes = 0
+        self.errors_made = 0
+
+    @property
+    def total(self):
+        return self.correct + self.incorrect
+
+    def add(self, typed_char, target_char, pasted=False):
+        """Record a newly typed character. Returns True if it was correct."""
+        if pasted:
+            self.pasted += 1
+            return typed_char == target_char
+        self.keystrokes += 1
+        if typed_char == target_char:
+            self.correct += 1
+            return True
+        self.incorrect += 1
+        self.errors_made += 1
+        return False
+
+    def remove(self, removed, target_segment, pasted=None):
+        """Record removed characters and the target text they were typed over.
+
+        pasted, if given, holds a flag for each removed character.
+        """
+        for i, (typed_char, target_char) in enumerate(zip(removed, target_segment)):
+            if pasted and pasted[i]:
+                self.pasted -= 1
+            elif typed_char == target_char:
+                self.correct -= 1
+            else:
+                self.incorrect -= 1
+
+    @property
+    def accuracy(self):
+        return (self.correct / self.total * 100) if self.total > 0 else 100
+
+    @property
+    def raw_accuracy(self):
+        """Accuracy over every keystroke, counting errors that were corrected."""
+        if self.keystrokes == 0:
+            return 100
+        return (self.keystrokes - self.errors_made) / self.keystrokes * 100
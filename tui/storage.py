@@ -0,0 +1,417 @@
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Fields stored as their own columns by the SQLite backend; anything else
+# recorded with a result is kept in a JSON "extra" column.
+RESULT_FIELDS = ("timestamp", "mode", "duration", "wpm", "accuracy", "raw_wpm")
+
+
+def _iso(value):
+    """Accept a datetime or an ISO string and return an ISO string."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class FileLock:
+    """Exclusive lock shared by every thread and process using the same path.
+
+    Backed by flock() on a separate lock file (msvcrt.locking on Windows).
+    Re-entrant within a thread, so a caller can hold it around several store
+    operations that also take it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                else:
+                    while True:
+                        try:
+                            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            # LK_LOCK gives up after ~10 s; keep waiting
+                            continue
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+
+
+class JsonlStore:
+    """History stored as one JSON record per line.
+
+    Appends are cheap; queries scan the file, which is fine for personal
+    histories but grows with the number of results.
+    """
+
+    def __init__(self, path, legacy_file=None):
+        self.path = path
+        self.legacy_file = legacy_file
+        # Serializes writers across threads and processes
+        self.lock = FileLock(path + ".lock")
+        self.ensure_file()
+
+    def ensure_file(self):
+        if os.path.exists(self.path):
+            return
+        with self.lock:
+            if os.path.exists(self.path):
+                # Another process created it while we waited
+                return
+            if self.legacy_file and os.path.exists(self.legacy_file):
+                self.migrate_legacy()
+            else:
+                open(self.path, "a").close()
+
+    def migrate_legacy(self):
+        try:
+            with open(self.legacy_file, "r") as f:
+                history = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            history = []
+
+        # Write to a temp file first so a crash never leaves a half-migrated log
+        tmp_file = self.path + ".tmp"
+        with open(tmp_file, "w") as f:
+            for entry in history:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_file, self.path)
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        if not data:
+            return
+        with self.lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                # A crash mid-write can leave an unterminated last line; end it
+                # so this batch starts on a line of its own
+                size = os.fstat(fd).st_size
+                if size:
+                    os.lseek(fd, size - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b"\n":
+                        data = b"\n" + data
+                # O_APPEND: every write lands at the current end of file
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def fingerprint(self):
+        """Identify the current contents; appends always change it."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return None
+
+    def iter_entries(self):
+        """Yield logged results, oldest first."""
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Skip a damaged line rather than losing the whole history
+                        continue
+        except FileNotFoundError:
+            return
+
+    def iter_rows(self):
+        """Yield (timestamp, mode, duration, wpm, accuracy, raw_wpm) tuples, oldest first."""
+        for entry in self.iter_entries():
+            yield tuple(entry.get(field) for field in RESULT_FIELDS)
+
+    def iter_newest_first(self, block_size=64 * 1024):
+        """Yield logged results, newest first, reading the file backwards in blocks."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b""
+            while pos > 0:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                lines = (f.read(step) + tail).split(b"\n")
+                # The first piece may be the end of a line that starts in an earlier block
+                tail = lines.pop(0)
+                for line in reversed(lines):
+                    entry = self._decode(line)
+                    if entry is not None:
+                        yield entry
+            entry = self._decode(tail)
+            if entry is not None:
+                yield entry
+
+    @staticmethod
+    def _decode(line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    def last(self, n):
+        recent = deque(self.iter_entries(), maxlen=n)
+        recent.reverse()
+        return list(recent)
+
+    def by_mode(self, mode, duration=None, limit=None):
+        matches = [
+            e for e in self.iter_entries()
+            if e.get("mode") == mode and (duration is None or e.get("duration") == duration)
+        ]
+        matches.reverse()
+        return matches[:limit] if limit is not None else matches
+
+    def date_range(self, start=None, end=None):
+        start, end = _iso(start), _iso(end)
+        matches = [
+            e for e in self.iter_entries()
+            if (start is None or e.get("timestamp", "") >= start)
+            and (end is None or e.get("timestamp", "") < end)
+        ]
+        matches.reverse()
+        return matches
+
+    def best_wpm_per_mode(self):
+        best = {}
+        for e in self.iter_entries():
+            mode = e.get("mode")
+            if mode not in best or e.get("wpm", 0) > best[mode].get("wpm", 0):
+                best[mode] = e
+        return best
+
+    def close(self):
+        pass
+
+
+class SqliteStore:
+    """History stored in a local SQLite database with indexed queries.
+
+    On first creation, results from an existing JSON-lines or legacy JSON
+    history are imported.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            mode TEXT,
+            duration INTEGER,
+            wpm REAL,
+            accuracy REAL,
+            raw_wpm REAL,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_results_mode ON results (mode, duration, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_results_duration ON results (duration, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_results_mode_wpm ON results (mode, wpm);
+    """
+
+    def __init__(self, path, import_files=()):
+        self.path = path
+        # SQLite serializes the writes themselves; this lock covers creation
+        # and work done around writes (such as the history summary)
+        self.lock = FileLock(path + ".lock")
+        # Imported here so the default JSON-lines backend never loads sqlite3
+        import sqlite3
+        with self.lock:
+            created = not os.path.exists(path)
+            # The connection may be used from a background writer thread;
+            # wait for other processes' writes rather than failing
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._conn.row_factory = sqlite3.Row
+            self._lock = threading.Lock()
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(self.SCHEMA)
+            if created:
+                self._import(import_files)
+
+    def _import(self, import_files):
+        for path in import_files:
+            if not path or not os.path.exists(path):
+                continue
+            if path.endswith(".jsonl"):
+                entries = JsonlStore(path).iter_entries()
+            else:
+                try:
+                    with open(path, "r") as f:
+                        entries = json.load(f)
+                except (json.JSONDecodeError, OSError):
+                    continue
+            self.append_many(entries)
+            return
+
+    @staticmethod
+    def _row_values(entry):
+        extra = {k: v for k, v in entry.items() if k not in RESULT_FIELDS}
+        return (
+            entry.get("timestamp", ""),
+            entry.get("mode"),
+            entry.get("duration"),
+            entry.get("wpm"),
+            entry.get("accuracy"),
+            entry.get("raw_wpm"),
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _row_entry(row):
+        entry = {field: row[field] for field in RESULT_FIELDS}
+        if row["extra"]:
+            entry.update(json.loads(row["extra"]))
+        return entry
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO results (timestamp, mode, duration, wpm, accuracy, raw_wpm, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self._row_values(e) for e in entries),
+            )
+
+    def _query(self, sql, params=(), raw=False):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return rows if raw else [self._row_entry(row) for row in rows]
+
+    def fingerprint(self):
+        """Identify the current contents; appends always change it."""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(id) FROM results").fetchone()[0]
+
+    def iter_entries(self):
+        """Yield logged results, oldest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM results ORDER BY timestamp, id").fetchall()
+        for row in rows:
+            yield self._row_entry(row)
+
+    def iter_rows(self):
+        """Yield (timestamp, mode, duration, wpm, accuracy, raw_wpm) tuples, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(RESULT_FIELDS)} FROM results ORDER BY timestamp, id"
+            ).fetchall()
+        return iter(rows)
+
+    def iter_newest_first(self, batch_size=200):
+        """Yield logged results, newest first, fetching rows in keyset-paged batches."""
+        rows = self._query(
+            "SELECT * FROM results ORDER BY timestamp DESC, id DESC LIMIT ?", (batch_size,), raw=True
+        )
+        while rows:
+            for row in rows:
+                yield self._row_entry(row)
+            last = rows[-1]
+            rows = self._query(
+                "SELECT * FROM results WHERE (timestamp, id) < (?, ?) "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (last["timestamp"], last["id"], batch_size), raw=True
+            )
+
+    def last(self, n):
+        return self._query("SELECT * FROM results ORDER BY timestamp DESC, id DESC LIMIT ?", (n,))
+
+    def by_mode(self, mode, duration=None, limit=None):
+        sql = "SELECT * FROM results WHERE mode = ?"
+        params = [mode]
+        if duration is not None:
+            sql += " AND duration = ?"
+            params.append(duration)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return self._query(sql, params)
+
+    def date_range(self, start=None, end=None):
+        sql = "SELECT * FROM results WHERE 1"
+        params = []
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(_iso(start))
+        if end is not None:
+            sql += " AND timestamp < ?"
+            params.append(_iso(end))
+        sql += " ORDER BY timestamp DESC, id DESC"
+        return self._query(sql, params)
+
+    def best_wpm_per_mode(self):
+        # Walk the distinct modes with a loose index scan, then take the top
+        # row per mode from (mode, wpm), so cost depends on mode count only
+        with self._lock:
+            modes = [row[0] for row in self._conn.execute(
+                "WITH RECURSIVE m(mode) AS ("
+                " SELECT MIN(mode) FROM results"
+                " UNION ALL"
+                " SELECT (SELECT MIN(mode) FROM results WHERE mode > m.mode) FROM m WHERE m.mode IS NOT NULL"
+                ") SELECT mode FROM m WHERE mode IS NOT NULL"
+            )]
+        best = {}
+        for mode in modes:
+            rows = self._query(
+                "SELECT * FROM results WHERE mode = ? ORDER BY wpm DESC LIMIT 1", (mode,)
+            )
+            if rows:
+                best[mode] = rows[0]
+        return best
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,116 @@
+import json
+import math
+import os
+
+
+class ModeSummary:
+    """Running WPM statistics for one (mode, duration) pair."""
+
+    RECENT = 10  # Size of the last-N ring
+    EWMA_ALPHA = 0.2
+
+    __slots__ = ("count", "total", "total_sq", "best", "recent", "ewma")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.best = 0.0
+        self.recent = []
+        self.ewma = None
+
+    def add(self, wpm):
+        self.count += 1
+        self.total += wpm
+        self.total_sq += wpm * wpm
+        self.best = max(self.best, wpm)
+        self.recent.append(wpm)
+        if len(self.recent) > self.RECENT:
+            del self.recent[0]
+        self.ewma = wpm if self.ewma is None else self.EWMA_ALPHA * wpm + (1 - self.EWMA_ALPHA) * self.ewma
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        for slot in cls.__slots__:
+            setattr(summary, slot, data[slot])
+        return summary
+
+
+class HistorySummary:
+    """Per-(mode, duration) aggregates kept in a small JSON file.
+
+    Updated in O(1) per logged result. `fingerprint` identifies the state of
+    the history store the summary matches; when it no longer matches (the
+    summary is missing, or the history was changed by something else) the
+    summary is rebuilt from the raw history.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.fingerprint = None
+        self.modes = {}  # (mode, duration) -> ModeSummary
+
+    @staticmethod
+    def _key(mode, duration):
+        return f"{mode}|{duration}"
+
+    def add(self, entry):
+        key = (entry.get("mode"), entry.get("duration"))
+        summary = self.modes.get(key)
+        if summary is None:
+            summary = self.modes[key] = ModeSummary()
+        summary.add(entry.get("wpm", 0))
+
+    def get(self, mode, duration):
+        return self.modes.get((mode, duration))
+
+    def rebuild(self, entries, fingerprint):
+        self.modes = {}
+        for entry in entries:
+            self.add(entry)
+        self.fingerprint = fingerprint
+
+    def load(self):
+        """Read the summary file. Returns False if it is missing or unreadable."""
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                return False
+            modes = {}
+            for key, value in data["modes"].items():
+                mode, _, duration = key.rpartition("|")
+                modes[(mode, int(duration) if duration.isdigit() else duration)] = ModeSummary.from_dict(value)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.modes = modes
+        self.fingerprint = data.get("fingerprint")
+        return True
+
+    def save(self):
+        data = {
+            "version": self.VERSION,
+            "fingerprint": self.fingerprint,
+            "modes": {self._key(*key): summary.to_dict() for key, summary in self.modes.items()},
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
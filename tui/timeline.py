@@ -0,0 +1,119 @@
+import base64
+import struct
+import sys
+import zlib
+from array import array
+
+
+class Timeline:
+    """Per-second WPM, raw WPM and error counts for one test.
+
+    Samples go into fixed-size `array` buffers allocated once and reused for
+    every test, used as a ring: a test longer than CAPACITY seconds keeps its
+    most recent CAPACITY seconds. Packed and compressed, a 60 second timeline
+    takes a couple of hundred bytes in a history entry.
+    """
+
+    # Covers the longest test offered in the menu
+    CAPACITY = 120
+
+    MAGIC = b"TTTL"
+    VERSION = 1
+    # magic, version, first stored second, sample count
+    HEADER = struct.Struct("<4sBIH")
+
+    __slots__ = ("wpm", "raw_wpm", "errors", "count", "_keystrokes", "_errors")
+
+    def __init__(self):
+        # WPM so far and raw WPM within the second, both capped at 65535;
+        # errors made within the second, capped at 255
+        self.wpm = array("H", bytes(2 * self.CAPACITY))
+        self.raw_wpm = array("H", bytes(2 * self.CAPACITY))
+        self.errors = array("B", bytes(self.CAPACITY))
+        self.reset()
+
+    def reset(self):
+        self.count = 0  # Seconds sampled, including any overwritten ones
+        self._keystrokes = 0
+        self._errors = 0
+
+    def __len__(self):
+        return min(self.count, self.CAPACITY)
+
+    @property
+    def first_second(self):
+        """Number of seconds dropped from the start of a long test."""
+        return self.count - len(self)
+
+    def sample(self, correct, keystrokes, errors_made, elapsed=None):
+        """Record the next second from the test's running totals at its end.
+
+        elapsed is the test time at the sample when it ends a partial last
+        second (the text was finished between two whole seconds).
+        """
+        end = self.count + 1 if elapsed is None else elapsed
+        span = end - self.count
+        if span <= 0 or end <= 0:
+            return
+        slot = self.count % self.CAPACITY
+        self.wpm[slot] = min(0xFFFF, round(correct * 12 / end))
+        self.raw_wpm[slot] = min(0xFFFF, round((keystrokes - self._keystrokes) * 12 / span))
+        self.errors[slot] = min(0xFF, errors_made - self._errors)
+        self._keystrokes = keystrokes
+        self._errors = errors_made
+        self.count += 1
+
+    def series(self, column):
+        """Samples of one column ("wpm", "raw_wpm" or "errors") in time order."""
+        values = getattr(self, column)
+        if self.count <= self.CAPACITY:
+            return values[:self.count].tolist()
+        split = self.count % self.CAPACITY
+        return values[split:].tolist() + values[:split].tolist()
+
+    # --- Serialization ---
+
+    def to_bytes(self):
+        parts = [self.HEADER.pack(self.MAGIC, self.VERSION, self.first_second, len(self))]
+        for column in ("wpm", "raw_wpm", "errors"):
+            values = array(getattr(self, column).typecode, self.series(column))
+            if sys.byteorder == "big":
+                values.byteswap()
+            parts.append(values.tobytes())
+        return zlib.compress(b"".join(parts), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = zlib.decompress(data)
+        magic, version, first, count = cls.HEADER.unpack_from(payload)
+        if magic != cls.MAGIC or version != cls.VERSION or count > cls.CAPACITY:
+            raise ValueError("Not a timeline")
+        if first and count != cls.CAPACITY:
+            raise ValueError("Damaged timeline")
+        timeline = cls()
+        # Stored oldest first; put each sample back in the slot it was recorded in
+        split = first % cls.CAPACITY
+        head = min(count, cls.CAPACITY - split)
+        offset = cls.HEADER.size
+        for column in ("wpm", "raw_wpm", "errors"):
+            ring = getattr(timeline, column)
+            values = array(ring.typecode)
+            size = count * values.itemsize
+            values.frombytes(payload[offset:offset + size])
+            if len(values) != count:
+                raise ValueError("Truncated timeline")
+            offset += size
+            if sys.byteorder == "big":
+                values.byteswap()
+            ring[split:split + head] = values[:head]
+            ring[:count - head] = values[head:]
+        timeline.count = first + count
+        return timeline
+
+    def encode(self):
+        """Return the timeline as a base64 string for storing in a history entry."""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, text):
+        return cls.from_bytes(base64.b64decode(text))